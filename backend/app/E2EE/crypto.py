@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from ..authentication import oauth2
 from ..database_configure import database, models
 from ..schema import Schemas
+from ..Websocket_configure.runtime import publish_user_change
 
 # Crypto profile endpoints for storing E2EE key material.
 router = APIRouter(tags=["Crypto"])
@@ -52,6 +53,7 @@ def upsert_crypto_profile(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    publish_user_change(current_user.id)
 
     return Schemas.CryptoProfileOut(
         public_key=current_user.public_key,
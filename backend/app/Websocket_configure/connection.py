@@ -0,0 +1,152 @@
+import asyncio
+import json
+from collections import deque
+from typing import Any, Callable
+
+from fastapi import WebSocket, status
+
+# What to do when a client's outbound queue is full.
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_COALESCE = "coalesce"
+OVERFLOW_DISCONNECT = "disconnect"
+OVERFLOW_POLICIES = {OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE, OVERFLOW_DISCONNECT}
+
+
+class OutboundConnection:
+    # One WebSocket with a bounded outbound queue drained by its own writer task.
+    # Producers only enqueue pre-encoded frames, so they never wait on the socket.
+    # With a batch window (client opt-in), the writer waits that long after
+    # going idle and sends the events queued meanwhile as one
+    # {"type":"batch","events":[...]} frame; a lone event is sent as-is.
+    def __init__(
+        self,
+        user_id: int,
+        websocket: WebSocket,
+        on_close: Callable[["OutboundConnection"], None],
+        max_queue: int = 256,
+        overflow_policy: str = OVERFLOW_DROP_OLDEST,
+        send_timeout: float = 5.0,
+        batch_window: float = 0.0,
+        batch_max_events: int = 100,
+    ) -> None:
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise RuntimeError(f"Unknown WebSocket overflow policy '{overflow_policy}'")
+        self.user_id = user_id
+        self.websocket = websocket
+        self._on_close = on_close
+        self._max_queue = max(1, max_queue)
+        self._overflow_policy = overflow_policy
+        self._send_timeout = send_timeout
+        self._batch_window = batch_window
+        self._batch_max_events = max(1, batch_max_events)
+        # Each entry is (coalesce_key, seq, encoded_frame).
+        self._queue: deque[tuple[str | None, int | None, str]] = deque()
+        # Highest replay-log sequence already queued by replay(); live copies
+        # of those events are skipped.
+        self._replayed_seq = 0
+        self._ready = asyncio.Event()
+        self._writer: asyncio.Task | None = None
+        self._closer: asyncio.Task | None = None
+        self.closed = False
+        self.evicted = False
+        self.dropped = 0
+        self.coalesced = 0
+        self.batches = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> None:
+        self._writer = asyncio.create_task(self._run())
+
+    def replay(self, frames: list[str], last_seq: int) -> None:
+        # Put missed frames (ending at `last_seq`) ahead of any live frames
+        # queued since the connection was registered, skipping duplicates.
+        # Call before start().
+        self._replayed_seq = last_seq
+        live = [entry for entry in self._queue if entry[1] is None or entry[1] > last_seq]
+        self._queue = deque((None, None, frame) for frame in frames)
+        self._queue.extend(live)
+        if self._queue:
+            self._ready.set()
+
+    def enqueue(self, message: str, coalesce_key: str | None = None, seq: int | None = None) -> bool:
+        # Queue a frame for delivery; returns False if the connection was evicted.
+        if self.closed:
+            return False
+        if seq is not None and seq <= self._replayed_seq:
+            return True
+        if len(self._queue) >= self._max_queue:
+            if self._overflow_policy == OVERFLOW_DISCONNECT:
+                self.close(status.WS_1013_TRY_AGAIN_LATER)
+                return False
+            if self._overflow_policy == OVERFLOW_COALESCE and coalesce_key is not None:
+                # Replace a queued frame for the same entity with the newer state.
+                for index, (queued_key, _, _) in enumerate(self._queue):
+                    if queued_key == coalesce_key:
+                        self._queue[index] = (coalesce_key, seq, message)
+                        self.coalesced += 1
+                        return True
+            self._queue.popleft()
+            self.dropped += 1
+        self._queue.append((coalesce_key, seq, message))
+        self._ready.set()
+        return True
+
+    def enqueue_json(self, payload: dict[str, Any]) -> bool:
+        # Queue a reply for this socket only (e.g. an error); it is not
+        # numbered or kept in the replay log.
+        return self.enqueue(json.dumps(payload, separators=(",", ":"), ensure_ascii=False))
+
+    def close(self, code: int | None = None) -> None:
+        # Stop the writer, drop pending frames and unregister from the manager.
+        if self.closed:
+            return
+        self.closed = True
+        # A close code means the server evicted this client (overflow or stall).
+        self.evicted = code is not None
+        self._queue.clear()
+        self._ready.set()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._on_close(self)
+        if code is not None:
+            self._closer = asyncio.create_task(self._close_socket(code))
+
+    async def _run(self) -> None:
+        while not self.closed:
+            await self._ready.wait()
+            self._ready.clear()
+            if self._batch_window > 0 and not self.closed:
+                # Let a burst accumulate so it goes out as one frame.
+                await asyncio.sleep(self._batch_window)
+            while self._queue and not self.closed:
+                message = self._next_frame()
+                try:
+                    await asyncio.wait_for(
+                        self.websocket.send_text(message), timeout=self._send_timeout
+                    )
+                except asyncio.TimeoutError:
+                    # Stalled consumer: evict it.
+                    self.close(status.WS_1013_TRY_AGAIN_LATER)
+                    return
+                except Exception:
+                    # If sending fails, drop the connection.
+                    self.close()
+                    return
+
+    def _next_frame(self) -> str:
+        if self._batch_window <= 0 or len(self._queue) == 1:
+            return self._queue.popleft()[2]
+        # Frames are already JSON, so the batch is assembled without re-encoding.
+        count = min(len(self._queue), self._batch_max_events)
+        events = [self._queue.popleft()[2] for _ in range(count)]
+        self.batches += 1
+        return '{"type":"batch","events":[' + ",".join(events) + "]}"
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), timeout=self._send_timeout)
+        except Exception:
+            pass
@@ -0,0 +1,148 @@
+from collections import OrderedDict, deque
+from typing import Any
+
+# Per-user event sequence and bounded replay log for WebSocket reconnects.
+# Every event delivered to a user gets the next number of that user's
+# sequence, added to the frame as "seq"; the newest `size` frames are kept so
+# a client reconnecting with `?since=<last seq>` gets exactly what it missed.
+
+# Sent instead of a replay when the missed events are no longer in the log
+# (or the sequence was reset); the client must resync over REST.
+RESYNC_REQUIRED = "resync_required"
+
+
+def with_seq(message: str, seq: int) -> str:
+    # Add "seq" to an encoded JSON object without re-encoding it.
+    if message == "{}":
+        return f'{{"seq":{seq}}}'
+    return f'{{"seq":{seq},{message[1:]}'
+
+
+class EventLog:
+    async def append(self, user_id: int, message: str) -> int:
+        # Assign the user's next sequence number to an encoded event and
+        # store the frame; returns the number.
+        raise NotImplementedError
+
+    async def since(self, user_id: int, seq: int) -> tuple[int, list[str] | None]:
+        # (current sequence, frames after `seq`), or None for the frames when
+        # some of them are gone and the client has to resync.
+        raise NotImplementedError
+
+
+def _select(current: int, frames: list[str], since: int) -> list[str] | None:
+    # `frames` are the newest retained frames, ending at sequence `current`.
+    first = current - len(frames) + 1
+    if since > current or since < first - 1:
+        # Ahead of us (sequence reset) or older than the retained window.
+        return None
+    return frames[since - first + 1:]
+
+
+class InMemoryEventLog(EventLog):
+    # Per-process log, for single-worker deployments. Logs of the least
+    # recently active users are dropped beyond `max_users` (their clients
+    # resync); sequence counters are kept so numbers never repeat.
+    def __init__(self, size: int = 100, max_users: int = 10000) -> None:
+        self._size = max(1, size)
+        self._max_users = max(1, max_users)
+        self._seqs: dict[int, int] = {}
+        self._frames: OrderedDict[int, deque[str]] = OrderedDict()
+
+    async def append(self, user_id: int, message: str) -> int:
+        seq = self._seqs.get(user_id, 0) + 1
+        self._seqs[user_id] = seq
+        frames = self._frames.get(user_id)
+        if frames is None:
+            frames = self._frames[user_id] = deque(maxlen=self._size)
+            if len(self._frames) > self._max_users:
+                self._frames.popitem(last=False)
+        else:
+            self._frames.move_to_end(user_id)
+        frames.append(with_seq(message, seq))
+        return seq
+
+    async def since(self, user_id: int, seq: int) -> tuple[int, list[str] | None]:
+        current = self._seqs.get(user_id, 0)
+        return current, _select(current, list(self._frames.get(user_id, ())), seq)
+
+
+# KEYS: sequence counter, frame list. ARGV: encoded event, log size, TTL.
+_REDIS_APPEND = """
+local seq = redis.call('INCR', KEYS[1])
+local frame
+if ARGV[1] == '{}' then
+    frame = '{"seq":' .. seq .. '}'
+else
+    frame = '{"seq":' .. seq .. ',' .. string.sub(ARGV[1], 2)
+end
+redis.call('RPUSH', KEYS[2], frame)
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return seq
+"""
+
+# KEYS: sequence counter, frame list. Read both in one step.
+_REDIS_SINCE = """
+return {tonumber(redis.call('GET', KEYS[1]) or '0'), redis.call('LRANGE', KEYS[2], 0, -1)}
+"""
+
+
+class RedisEventLog(EventLog):
+    # Log shared by every worker (and surviving restarts), used with the
+    # redis pub/sub backend. Idle users' logs expire after `ttl_seconds`.
+    def __init__(
+        self,
+        url: str | None = None,
+        client: Any = None,
+        size: int = 100,
+        ttl_seconds: int = 86400,
+        prefix: str = "chitchat:ws-log:",
+    ) -> None:
+        if client is None:
+            if not url:
+                raise RuntimeError("REDIS_URL is required for the redis WebSocket event log")
+            try:
+                from redis import asyncio as redis_asyncio
+            except ImportError as exc:
+                raise RuntimeError(
+                    "The 'redis' package is required for the redis WebSocket event log"
+                ) from exc
+            client = redis_asyncio.from_url(url)
+        self._size = max(1, size)
+        self._ttl_seconds = max(1, ttl_seconds)
+        self._prefix = prefix
+        self._append = client.register_script(_REDIS_APPEND)
+        self._since = client.register_script(_REDIS_SINCE)
+
+    def _keys(self, user_id: int) -> list[str]:
+        # Hash tag keeps both keys in one slot on Redis Cluster.
+        return [f"{self._prefix}{{{user_id}}}:seq", f"{self._prefix}{{{user_id}}}:frames"]
+
+    async def append(self, user_id: int, message: str) -> int:
+        seq = await self._append(keys=self._keys(user_id), args=[message, self._size, self._ttl_seconds])
+        return int(seq)
+
+    async def since(self, user_id: int, seq: int) -> tuple[int, list[str] | None]:
+        current, frames = await self._since(keys=self._keys(user_id))
+        frames = [frame.decode() if isinstance(frame, bytes) else frame for frame in frames]
+        return int(current), _select(int(current), frames, seq)
+
+
+def create_event_log(
+    backend: str,
+    redis_url: str | None = None,
+    size: int = 100,
+    max_users: int = 10000,
+    ttl_seconds: int = 86400,
+) -> EventLog | None:
+    # Log matching the pub/sub backend ("memory" or "redis"); None when disabled.
+    if size <= 0:
+        return None
+    normalized = (backend or "memory").strip().lower()
+    if normalized == "memory":
+        return InMemoryEventLog(size=size, max_users=max_users)
+    if normalized == "redis":
+        return RedisEventLog(url=redis_url, size=size, ttl_seconds=ttl_seconds)
+    raise RuntimeError(f"Unknown WebSocket pub/sub backend '{backend}'")
@@ -1,40 +1,252 @@
+import asyncio
+import json
+import logging
 from collections import defaultdict
-from typing import Any, DefaultDict, Set
+from typing import Any, Callable, DefaultDict, Iterable
 
 from fastapi import WebSocket
 
-# In-memory connection registry (per-process).
-# For multi-worker deployments, replace with a shared pub/sub layer.
+from .connection import OVERFLOW_DROP_OLDEST, OVERFLOW_POLICIES, OutboundConnection
+from .event_log import RESYNC_REQUIRED, EventLog, with_seq
+from .pubsub import InMemoryPubSub, PubSubBackend
+
+logger = logging.getLogger(__name__)
+
+# Connection registry is per-process; cross-worker fan-out goes through
+# the pub/sub backend so each worker only writes to its own sockets.
+
+
+def _encode(payload: dict[str, Any]) -> str:
+    # Same format as WebSocket.send_json.
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+
+def _coalesce_key(payload: dict[str, Any]) -> str | None:
+    # Events that describe the latest state of one entity can replace each other
+    # in a full outbound queue; plain new-message events are never coalesced.
+    event_type = payload.get("type")
+    if event_type == "message_edited":
+        message = payload.get("message") or {}
+        return f"message:{message.get('id')}"
+    if event_type in ("message_deleted_for_everyone", "message_deleted_for_me"):
+        return f"message:{payload.get('message_id')}"
+    if event_type == "conversation_cleared":
+        return f"conversation:{payload.get('friend_id')}"
+    if isinstance(payload.get("request"), dict):
+        return f"friend_request:{payload['request'].get('id')}"
+    return None
 
 
 class ConnectionManager:
     # Tracks active WebSocket connections per user id.
-    def __init__(self) -> None:
-        self._connections: DefaultDict[int, Set[WebSocket]] = defaultdict(set)
+    def __init__(
+        self,
+        pubsub: PubSubBackend | None = None,
+        send_timeout: float = 5.0,
+        max_queue: int = 256,
+        overflow_policy: str = OVERFLOW_DROP_OLDEST,
+        batch_window: float = 0.0,
+        batch_max_events: int = 100,
+        event_log: EventLog | None = None,
+    ) -> None:
+        # Checked here so a bad setting fails at boot, not on every connect.
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise RuntimeError(f"Unknown WebSocket overflow policy '{overflow_policy}'")
+        self._connections: DefaultDict[int, dict[WebSocket, OutboundConnection]] = defaultdict(dict)
+        self._pubsub = pubsub or InMemoryPubSub()
+        # Upper bound for a single socket write; slower sockets are evicted.
+        self._send_timeout = send_timeout
+        self._max_queue = max_queue
+        self._overflow_policy = overflow_policy
+        # Coalescing window for clients that opt into batch frames (0 disables).
+        self._batch_window = batch_window
+        self._batch_max_events = batch_max_events
+        # Per-user sequence and replay log for reconnects (None disables "seq").
+        self._event_log = event_log
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Fan-outs scheduled by dispatch() on this loop, kept until done.
+        self._dispatch_tasks: set[asyncio.Task] = set()
+        # Worker-level handlers for control events (published with no target users).
+        self._control_handlers: dict[str, Callable[[dict[str, Any]], None]] = {}
+        # Counters carried over from connections that already closed.
+        self._dropped_total = 0
+        self._coalesced_total = 0
+        self._evicted_total = 0
+        self._batches_total = 0
+
+    async def start(self) -> None:
+        # Subscribe this worker to the shared event stream.
+        self._loop = asyncio.get_running_loop()
+        await self._pubsub.start(self.deliver_local)
 
-    async def connect(self, user_id: int, websocket: WebSocket) -> None:
-        # Accept the connection and register it for the user.
+    async def stop(self) -> None:
+        # Let fan-outs already scheduled reach the pub/sub backend first.
+        if self._dispatch_tasks:
+            await asyncio.gather(*self._dispatch_tasks, return_exceptions=True)
+        await self._pubsub.stop()
+        for connections in list(self._connections.values()):
+            for connection in list(connections.values()):
+                connection.close()
+        self._loop = None
+
+    async def connect(
+        self, user_id: int, websocket: WebSocket, batch: bool = False, since: int | None = None
+    ) -> OutboundConnection:
+        # Accept the connection, register it and start its writer task.
+        # `batch`: the client accepts {"type":"batch","events":[...]} frames.
+        # `since`: last seq the client saw; missed events are sent first, or
+        # a resync_required event if they are no longer in the log.
         await websocket.accept()
-        self._connections[user_id].add(websocket)
+        connection = OutboundConnection(
+            user_id,
+            websocket,
+            on_close=self._unregister,
+            max_queue=self._max_queue,
+            overflow_policy=self._overflow_policy,
+            send_timeout=self._send_timeout,
+            batch_window=self._batch_window if batch else 0.0,
+            batch_max_events=self._batch_max_events,
+        )
+        # Registered before reading the log so nothing published meanwhile is
+        # missed; replay() drops the live copies of replayed events.
+        self._connections[user_id][websocket] = connection
+        if since is not None and self._event_log is not None:
+            try:
+                current, frames = await self._event_log.since(user_id, since)
+            except BaseException:
+                # e.g. the redis log is unreachable: unregister before the
+                # error reaches the handler, or the idle entry keeps queueing.
+                connection.close()
+                raise
+            if frames is None:
+                frames = [_encode({"type": RESYNC_REQUIRED, "seq": current})]
+            connection.replay(frames, current)
+        connection.start()
+        return connection
 
     def disconnect(self, user_id: int, websocket: WebSocket) -> None:
-        # Remove a WebSocket from the registry.
-        if user_id in self._connections:
-            self._connections[user_id].discard(websocket)
-            if not self._connections[user_id]:
-                self._connections.pop(user_id, None)
+        # Remove a WebSocket from the registry and stop its writer.
+        connection = self._connections.get(user_id, {}).get(websocket)
+        if connection is not None:
+            connection.close()
+
+    def _unregister(self, connection: OutboundConnection) -> None:
+        connections = self._connections.get(connection.user_id)
+        if connections is None or connections.get(connection.websocket) is not connection:
+            return
+        connections.pop(connection.websocket, None)
+        if not connections:
+            self._connections.pop(connection.user_id, None)
+        self._dropped_total += connection.dropped
+        self._coalesced_total += connection.coalesced
+        self._evicted_total += int(connection.evicted)
+        self._batches_total += connection.batches
 
     async def send_to_user(self, user_id: int, payload: dict[str, Any]) -> None:
-        # Send a JSON payload to all sockets for a user (best-effort).
-        sockets = list(self._connections.get(user_id, set()))
-        for socket in sockets:
-            try:
-                await socket.send_json(payload)
-            except Exception:
-                # If sending fails, drop the connection.
-                self.disconnect(user_id, socket)
-
-    async def send_to_users(self, user_ids: set[int], payload: dict[str, Any]) -> None:
-        # Fan-out a JSON payload to multiple users.
-        for user_id in user_ids:
-            await self.send_to_user(user_id, payload)
+        # Publish a JSON payload for all sockets of a user, on every worker.
+        await self.send_to_users({user_id}, payload)
+
+    async def send_to_users(self, user_ids: Iterable[int], payload: dict[str, Any]) -> None:
+        # Publish once per event; each worker fans out to its local sockets.
+        # User events are first appended to each recipient's replay log, which
+        # assigns the per-user seq carried along to every worker. If the log
+        # is unavailable the event still goes out, without a seq for the
+        # users it could not be logged for.
+        user_ids = set(user_ids)
+        seqs = None
+        if self._event_log is not None and user_ids:
+            message = _encode(payload)
+            ordered = sorted(user_ids)
+            results = await asyncio.gather(
+                *(self._event_log.append(user_id, message) for user_id in ordered),
+                return_exceptions=True,
+            )
+            seqs = {}
+            failures = []
+            for user_id, result in zip(ordered, results):
+                if isinstance(result, BaseException):
+                    failures.append(result)
+                else:
+                    seqs[user_id] = result
+            if failures:
+                logger.error(
+                    "Appending %s event to the replay log failed for %d of %d users",
+                    payload.get("type"),
+                    len(failures),
+                    len(ordered),
+                    exc_info=failures[0],
+                )
+        try:
+            await self._pubsub.publish(user_ids, payload, seqs or None)
+        except Exception:
+            # Fan-out is best-effort: callers have already stored the change,
+            # and clients missing it catch up through the replay log.
+            logger.exception("Publishing %s event failed", payload.get("type"))
+
+    def add_control_handler(
+        self, event_type: str, handler: Callable[[dict[str, Any]], None]
+    ) -> None:
+        # Run `handler(payload)` on every worker when a control event of this type is published.
+        self._control_handlers[event_type] = handler
+
+    def dispatch_control(self, payload: dict[str, Any]) -> None:
+        # Publish a control event (e.g. cache invalidation) to every worker.
+        self.dispatch(set(), payload)
+
+    def dispatch(self, user_ids: Iterable[int], payload: dict[str, Any]) -> None:
+        # Schedule a fan-out from sync route handlers, which run in the threadpool.
+        user_ids = set(user_ids)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            task = loop.create_task(self.send_to_users(user_ids, payload))
+            self._dispatch_tasks.add(task)
+            task.add_done_callback(self._dispatch_tasks.discard)
+        elif self._loop is not None and self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.send_to_users(user_ids, payload), self._loop)
+        else:
+            asyncio.run(self.send_to_users(user_ids, payload))
+
+    async def deliver_local(
+        self, user_ids: set[int], payload: dict[str, Any], seqs: dict[int, int] | None = None
+    ) -> None:
+        # Queue a published event on the sockets held by this worker (best-effort).
+        if not user_ids:
+            handler = self._control_handlers.get(payload.get("type"))
+            if handler is not None:
+                handler(payload)
+            return
+        targets = [user_id for user_id in user_ids if self._connections.get(user_id)]
+        if not targets:
+            return
+        # Encode once per event; each connection's writer task drains its own
+        # queue, so a slow client never delays delivery to the others.
+        message = _encode(payload)
+        coalesce_key = _coalesce_key(payload)
+        seqs = seqs or {}
+        for user_id in targets:
+            seq = seqs.get(user_id)
+            frame = message if seq is None else with_seq(message, seq)
+            for connection in list(self._connections.get(user_id, {}).values()):
+                connection.enqueue(frame, coalesce_key, seq)
+
+    def metrics(self) -> dict[str, int]:
+        # Snapshot of outbound queue health for this worker.
+        connections = [
+            connection
+            for per_user in self._connections.values()
+            for connection in per_user.values()
+        ]
+        depths = [connection.depth for connection in connections]
+        return {
+            "connected_users": len(self._connections),
+            "connections": len(connections),
+            "queued_frames": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "dropped_frames": self._dropped_total + sum(c.dropped for c in connections),
+            "coalesced_frames": self._coalesced_total + sum(c.coalesced for c in connections),
+            "evicted_connections": self._evicted_total,
+            "batch_frames": self._batches_total + sum(c.batches for c in connections),
+        }
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Called on every worker with (user_ids, payload, seqs) for each published
+# event; `seqs` maps user ids to the event's number in their replay log.
+EventHandler = Callable[[set[int], dict[str, Any], dict[int, int]], Awaitable[None]]
+
+WS_EVENTS_CHANNEL = "chitchat:ws-events"
+
+# Backoff between resubscribe attempts after the Redis connection drops.
+RESUBSCRIBE_MIN_SECONDS = 0.5
+RESUBSCRIBE_MAX_SECONDS = 30.0
+
+
+class PubSubBackend:
+    # Transport that carries WebSocket events between workers.
+    # Each worker publishes an event once; every subscribed worker
+    # (including the publisher) delivers it to its own local sockets.
+    async def start(self, handler: EventHandler) -> None:
+        raise NotImplementedError
+
+    async def stop(self) -> None:
+        raise NotImplementedError
+
+    async def publish(
+        self, user_ids: Iterable[int], payload: dict[str, Any], seqs: dict[int, int] | None = None
+    ) -> None:
+        raise NotImplementedError
+
+
+class InMemoryPubSub(PubSubBackend):
+    # Single-process backend: publishing hands the event straight to the local handler.
+    def __init__(self) -> None:
+        self._handler: EventHandler | None = None
+
+    async def start(self, handler: EventHandler) -> None:
+        self._handler = handler
+
+    async def stop(self) -> None:
+        self._handler = None
+
+    async def publish(
+        self, user_ids: Iterable[int], payload: dict[str, Any], seqs: dict[int, int] | None = None
+    ) -> None:
+        if self._handler is None:
+            return
+        await self._handler(set(user_ids), payload, seqs or {})
+
+
+class RedisPubSub(PubSubBackend):
+    # Redis-compatible backend for multi-worker / multi-node deployments.
+    # Any client exposing the `redis.asyncio` publish()/pubsub() API can be
+    # injected, so a local stand-in (e.g. fakeredis) can replace Redis in tests.
+    def __init__(
+        self,
+        url: str | None = None,
+        client: Any = None,
+        channel: str = WS_EVENTS_CHANNEL,
+    ) -> None:
+        if client is None:
+            if not url:
+                raise RuntimeError("REDIS_URL is required for the redis pub/sub backend")
+            try:
+                from redis import asyncio as redis_asyncio
+            except ImportError as exc:
+                raise RuntimeError(
+                    "The 'redis' package is required for the redis pub/sub backend"
+                ) from exc
+            client = redis_asyncio.from_url(url)
+        self._client = client
+        self._channel = channel
+        self._pubsub: Any = None
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, handler: EventHandler) -> None:
+        # Subscribing here makes an unreachable Redis fail the worker at boot.
+        await self._subscribe()
+        self._listener = asyncio.create_task(self._listen(handler))
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._close_subscription()
+
+    async def publish(
+        self, user_ids: Iterable[int], payload: dict[str, Any], seqs: dict[int, int] | None = None
+    ) -> None:
+        envelope = {"user_ids": sorted(set(user_ids)), "payload": payload}
+        if seqs:
+            envelope["seqs"] = {str(user_id): seq for user_id, seq in seqs.items()}
+        await self._client.publish(self._channel, json.dumps(envelope))
+
+    async def _subscribe(self) -> None:
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self._channel)
+
+    async def _close_subscription(self) -> None:
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is None:
+            return
+        try:
+            await pubsub.unsubscribe(self._channel)
+            await pubsub.aclose()
+        except Exception:
+            # The connection is usually already gone when this fails.
+            logger.debug("Closing pub/sub subscription on %s failed", self._channel, exc_info=True)
+
+    async def _listen(self, handler: EventHandler) -> None:
+        # Runs until stop(). A dropped Redis connection is logged and the
+        # channel resubscribed with backoff; events published meanwhile are
+        # lost (pub/sub is at-most-once), which clients recover from through
+        # the replay log and caches through their TTLs.
+        delay = RESUBSCRIBE_MIN_SECONDS
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._subscribe()
+                    logger.info("Resubscribed to pub/sub channel %s", self._channel)
+                async for message in self._pubsub.listen():
+                    delay = RESUBSCRIBE_MIN_SECONDS
+                    await self._dispatch(handler, message)
+                logger.warning("Pub/sub stream on %s ended", self._channel)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "Pub/sub listener on %s failed; resubscribing in %.1fs", self._channel, delay
+                )
+            await self._close_subscription()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RESUBSCRIBE_MAX_SECONDS)
+
+    async def _dispatch(self, handler: EventHandler, message: dict[str, Any]) -> None:
+        if message.get("type") != "message":
+            return
+        try:
+            envelope = json.loads(message["data"])
+            user_ids = {int(user_id) for user_id in envelope["user_ids"]}
+            payload = envelope["payload"]
+            seqs = {int(user_id): int(seq) for user_id, seq in envelope.get("seqs", {}).items()}
+        except (AttributeError, KeyError, TypeError, ValueError):
+            logger.warning("Dropping malformed pub/sub event on %s", self._channel)
+            return
+        try:
+            await handler(user_ids, payload, seqs)
+        except Exception:
+            # Never let one bad delivery kill the subscription loop.
+            logger.exception("Local delivery of pub/sub event failed")
+
+
+def create_pubsub_backend(backend: str, redis_url: str | None = None) -> PubSubBackend:
+    # Build the configured backend ("memory" or "redis").
+    normalized = (backend or "memory").strip().lower()
+    if normalized == "memory":
+        return InMemoryPubSub()
+    if normalized == "redis":
+        return RedisPubSub(url=redis_url)
+    raise RuntimeError(f"Unknown WebSocket pub/sub backend '{backend}'")
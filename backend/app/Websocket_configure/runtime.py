@@ -1,4 +1,49 @@
+from ..authentication.user_cache import user_cache
+from ..configaration.config import settings
+from ..database_configure.friendship_cache import friendship_cache
+from .event_log import create_event_log
 from .manager import ConnectionManager
+from .pubsub import create_pubsub_backend
 
 # Shared connection manager across routers.
-manager = ConnectionManager()
+manager = ConnectionManager(
+    create_pubsub_backend(settings.ws_pubsub_backend, settings.redis_url),
+    send_timeout=settings.ws_send_timeout_seconds,
+    max_queue=settings.ws_outbound_queue_size,
+    overflow_policy=settings.ws_overflow_policy,
+    batch_window=settings.ws_batch_window_ms / 1000,
+    batch_max_events=settings.ws_batch_max_events,
+    event_log=create_event_log(
+        settings.ws_pubsub_backend,
+        settings.redis_url,
+        size=settings.ws_replay_log_size,
+        max_users=settings.ws_replay_log_max_users,
+        ttl_seconds=settings.ws_replay_log_ttl_seconds,
+    ),
+)
+
+
+def _on_friendship_changed(payload: dict) -> None:
+    friendship_cache.invalidate(*payload.get("user_ids", []))
+
+
+manager.add_control_handler("friendship_changed", _on_friendship_changed)
+
+
+def publish_friendship_change(user_ids: set[int]) -> None:
+    # Drop cached friend sets here right away, then on every other worker.
+    friendship_cache.invalidate(*user_ids)
+    manager.dispatch_control({"type": "friendship_changed", "user_ids": sorted(user_ids)})
+
+
+def _on_user_changed(payload: dict) -> None:
+    user_cache.invalidate(*payload.get("user_ids", []))
+
+
+manager.add_control_handler("user_changed", _on_user_changed)
+
+
+def publish_user_change(user_id: int) -> None:
+    # Drop the cached user row here right away, then on every other worker.
+    user_cache.invalidate(user_id)
+    manager.dispatch_control({"type": "user_changed", "user_ids": [user_id]})
@@ -4,10 +4,11 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
-from ..database_configure import database, models
+from ..database_configure import database
 
 from ..schema import Schemas
 from ..configaration.config import settings
+from .user_cache import user_cache
 
 # OAuth2 bearer token extractor (expects token in Authorization header).
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
@@ -47,7 +48,7 @@ def get_current_user(token: str = Depends(oauth2_scheme),db: Session = Depends(d
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,detail="Could not validate credentials",headers={"WWW-Authenticate": "Bearer"},)
     
     token_data = verify_access_token(token, credentials_exception)
-    user = db.query(models.User).filter(models.User.id == token_data.id).first()
+    user = user_cache.get(db, token_data.id)
     if user is None:
         raise credentials_exception
     return user
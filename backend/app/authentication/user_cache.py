@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from ..configaration.config import settings
+from ..database_configure import models
+
+
+class UserCache:
+    # Short-TTL per-worker cache of user rows keyed by id, so authenticated
+    # requests skip the user lookup. Entries hold plain column values; each
+    # hit is attached to the caller's session as its own instance, so
+    # endpoints can still modify and commit `current_user` as before.
+    def __init__(self, ttl_seconds: float = 30.0, max_users: int = 10000) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._max_users = max(1, max_users)
+        self._rows: OrderedDict[int, tuple[float, dict[str, Any]]] = OrderedDict()
+        # Bumped on invalidation so a load racing with it is not stored.
+        self._generations: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._hit_seconds = 0.0
+        self._miss_seconds = 0.0
+
+    def get(self, db: Session, user_id: int) -> models.User | None:
+        started = time.perf_counter()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._rows.get(user_id)
+            generation = self._generations.get(user_id, 0)
+            if entry is not None and entry[0] <= now:
+                self._rows.pop(user_id, None)
+                entry = None
+
+        if entry is not None:
+            user = models.User(**entry[1])
+            make_transient_to_detached(user)
+            user = db.merge(user, load=False)
+            with self._lock:
+                self.hits += 1
+                self._hit_seconds += time.perf_counter() - started
+            return user
+
+        user = db.query(models.User).filter(models.User.id == user_id).first()
+        with self._lock:
+            if user is not None and self._generations.get(user_id, 0) == generation:
+                self._rows[user_id] = (now + self._ttl_seconds, _row_data(user))
+                self._rows.move_to_end(user_id)
+                while len(self._rows) > self._max_users:
+                    evicted_id, _ = self._rows.popitem(last=False)
+                    self._generations.pop(evicted_id, None)
+            self.misses += 1
+            self._miss_seconds += time.perf_counter() - started
+        return user
+
+    def invalidate(self, *user_ids: int) -> None:
+        with self._lock:
+            for user_id in user_ids:
+                self._rows.pop(user_id, None)
+                self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "avg_hit_ms": self._hit_seconds * 1000 / self.hits if self.hits else 0.0,
+                "avg_miss_ms": self._miss_seconds * 1000 / self.misses if self.misses else 0.0,
+                "cached_users": len(self._rows),
+            }
+
+
+def _row_data(user: models.User) -> dict[str, Any]:
+    return {column.key: getattr(user, column.key) for column in models.User.__table__.columns}
+
+
+# Shared per-worker user cache.
+user_cache = UserCache(
+    ttl_seconds=settings.user_cache_ttl_seconds,
+    max_users=settings.user_cache_max_users,
+)
@@ -1,17 +1,61 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
-# Password hashing configuration.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from ..configaration.config import settings
+
+# Password hashing configuration. Hashes below the configured cost are
+# reported as needing an update and get rehashed on the next login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.password_hash_rounds,
+    bcrypt__min_rounds=settings.password_hash_rounds,
+)
+
+# Dedicated bounded pool for bcrypt so a login storm cannot take over the
+# shared request threadpool. bcrypt releases the GIL, so threads scale with cores.
+_hash_workers = settings.password_hash_workers or os.cpu_count() or 1
+_hash_executor = ThreadPoolExecutor(max_workers=_hash_workers, thread_name_prefix="password-hash")
+# Running + queued hash jobs; beyond this callers get a fast 503.
+_hash_slots = threading.BoundedSemaphore(_hash_workers + settings.password_hash_max_queue)
+
+
+def _submit_hash_job(fn: Callable[..., Any], *args: Any) -> Future:
+    if not _hash_slots.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    future = _hash_executor.submit(fn, *args)
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
 
 
 def hash_password(password: str) -> str:
     # Hash a plain-text password before storing it.
-    return pwd_context.hash(password)
+    return _submit_hash_job(pwd_context.hash, password).result()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     # Compare a plain-text password with its hashed version.
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit_hash_job(pwd_context.verify, plain_password, hashed_password).result()
+
+
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    # Async verify for event-loop handlers; also returns a replacement hash
+    # when the stored one uses a deprecated scheme or a lower cost factor.
+    return await asyncio.wrap_future(
+        _submit_hash_job(pwd_context.verify_and_update, plain_password, hashed_password)
+    )
 
 
 def normalize_email(email: str) -> str:
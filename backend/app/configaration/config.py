@@ -6,6 +6,37 @@ from .env_loader import ENVIRONMENT
 class Settings(BaseSettings):
     environment: str = ENVIRONMENT
     database_url: str | None = None
+    # Connection pool sizing; connections should scale with request/message
+    # rate, not with the number of connected WebSocket users.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout_seconds: float = 30.0
+    # Schema management at worker startup. Migrations run via `python -m app.migrate`;
+    # workers only optionally check the revision ("off", "warn" or "strict") and,
+    # for local development, can create the tables on an unversioned database.
+    schema_check: str = "off"
+    db_auto_create_tables: bool = False
+    # Group commit for new chat messages: collect for up to this window, or
+    # until the batch is full, then store them with one INSERT/commit.
+    message_batch_window_ms: float = 5.0
+    message_batch_max_size: int = 200
+    # Per-worker friendship cache size (number of users whose friend sets are
+    # kept) and how long a set is trusted if an invalidation event is lost.
+    friendship_cache_max_users: int = 10000
+    friendship_cache_ttl_seconds: float = 30.0
+    # Per-worker cache of authenticated user rows.
+    user_cache_ttl_seconds: float = 30.0
+    user_cache_max_users: int = 10000
+    # bcrypt cost factor and the dedicated hashing pool (workers default to CPU count).
+    password_hash_rounds: int = 12
+    password_hash_workers: int | None = None
+    password_hash_max_queue: int = 64
+    # Serve 2-character user searches from an in-process username prefix index.
+    user_search_prefix_index: bool = False
+    user_search_prefix_index_refresh_seconds: float = 300.0
+    # Encode large chat/friend list responses with orjson and skip pydantic
+    # re-validation of the (trusted) serializer output. Same wire format.
+    fast_json_responses: bool = False
     # JWT signing configuration.
     secret_key: str
     algorithm: str
@@ -17,6 +48,47 @@ class Settings(BaseSettings):
     smtp_password: str
     smtp_from_email: str
     smtp_use_tls: bool = True
+    # Persistent SMTP sessions kept by the mailer (the most sockets it opens
+    # to the relay) and emails sent per session before it is recycled.
+    smtp_pool_size: int = 4
+    smtp_max_messages_per_connection: int = 100
+    # Email outbox worker: rows claimed per batch, idle poll interval, retry
+    # backoff (doubling from base up to max) and attempts before a row is
+    # marked failed. Claimed rows not finished within the lease are retried.
+    # Failed rows are purged after the retention period (expired ones sooner).
+    email_outbox_batch_size: int = 50
+    email_outbox_poll_seconds: float = 2.0
+    email_outbox_retry_base_seconds: float = 10.0
+    email_outbox_retry_max_seconds: float = 900.0
+    email_outbox_max_attempts: int = 8
+    email_outbox_lease_seconds: float = 120.0
+    email_outbox_failed_retention_seconds: float = 86400.0
+    # Cross-worker WebSocket fan-out ("memory" for a single worker, "redis" for many).
+    ws_pubsub_backend: str = "memory"
+    redis_url: str | None = None
+    # Per-socket write timeout; sockets slower than this are evicted.
+    ws_send_timeout_seconds: float = 5.0
+    # Bounded per-socket outbound queue and what to do when it fills up
+    # ("drop_oldest", "coalesce" or "disconnect").
+    ws_outbound_queue_size: int = 256
+    ws_overflow_policy: str = "drop_oldest"
+    # Coalescing window and size cap for clients that connect with `batch=1`
+    # and accept {"type":"batch","events":[...]} frames (0 disables batching).
+    ws_batch_window_ms: float = 20.0
+    ws_batch_max_events: int = 100
+    # Per-user replay log for clients reconnecting with `since=<seq>`: events
+    # kept per user (0 disables seq numbers), users kept by the "memory"
+    # backend, and idle expiry of the "redis" backend's logs.
+    ws_replay_log_size: int = 100
+    ws_replay_log_max_users: int = 10000
+    ws_replay_log_ttl_seconds: int = 86400
+    # Token-bucket throttling of login, email and search endpoints ("memory"
+    # keeps buckets per worker, "redis" shares them through REDIS_URL).
+    # Behind a reverse proxy, list its addresses/networks (comma-separated) so
+    # the client IP is taken from X-Forwarded-For instead of the proxy's.
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"
+    rate_limit_trusted_proxies: str = ""
 
     model_config = SettingsConfigDict(extra="ignore")
 
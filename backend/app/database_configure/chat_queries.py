@@ -0,0 +1,175 @@
+from datetime import datetime
+
+from sqlalchemy import Row, and_, func, or_, select, true, union_all
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Read-only query layer for chat and friend lists. Queries select plain
+# columns with Core and return result rows (named tuples), so nothing is
+# hydrated into ORM instances or tracked in the session's identity map.
+# Results are fetched in full: every caller returns them as one JSON body,
+# so a server-side cursor would only add round trips. Large reads are paged
+# by id instead (limit / after_id, as the export does).
+
+# Message columns, in Schemas.ChatMessageOut field order.
+MESSAGE_COLUMNS = (
+    models.chatting.id,
+    models.chatting.sender_id,
+    models.chatting.receiver_id,
+    models.chatting.ciphertext,
+    models.chatting.iv,
+    models.chatting.crypto_version,
+    models.chatting.is_deleted_for_everyone,
+    models.chatting.edited_at,
+    models.chatting.created_at,
+)
+
+# User columns, in Schemas.UserSummary field order.
+USER_SUMMARY_COLUMNS = (
+    models.User.id,
+    models.User.username,
+    models.User.name,
+    models.User.email,
+    models.User.public_key,
+)
+
+
+def conversation_filter(current_user_id: int, friend_id: int):
+    # Compares the direction-independent (least, greatest) pair so the filter is a
+    # single range on ix_chatting_conversation_* instead of an OR of two lookups.
+    low_id, high_id = sorted((current_user_id, friend_id))
+    return and_(
+        func.least(models.chatting.sender_id, models.chatting.receiver_id) == low_id,
+        func.greatest(models.chatting.sender_id, models.chatting.receiver_id) == high_id,
+    )
+
+
+def visible_for_user_filter(current_user_id: int):
+    # Messages the user has not deleted for themselves.
+    return or_(
+        and_(
+            models.chatting.sender_id == current_user_id,
+            models.chatting.deleted_for_sender.is_(False),
+        ),
+        and_(
+            models.chatting.receiver_id == current_user_id,
+            models.chatting.deleted_for_receiver.is_(False),
+        ),
+    )
+
+
+def friend_rows(db: Session, user_id: int) -> list[Row]:
+    # USER_SUMMARY_COLUMNS of the user's friends, by username.
+    return db.execute(
+        select(*USER_SUMMARY_COLUMNS)
+        .join(models.Friend, models.Friend.friend_id == models.User.id)
+        .where(models.Friend.owner_id == user_id)
+        .order_by(models.User.username.asc())
+    ).all()
+
+
+def chat_thread_rows(db: Session, user_id: int) -> list[Row]:
+    # USER_SUMMARY_COLUMNS of each friend followed by the latest visible
+    # message's id, ciphertext, iv, crypto_version, is_deleted_for_everyone and
+    # created_at (NULLs without messages), most recent conversation first.
+    # Per friend, the LATERAL subquery takes the newest message the user sent
+    # and the newest they received, each the first entry of a backwards scan
+    # of the partial ix_chatting_sender_visible / ix_chatting_receiver_visible
+    # index. Rows the user deleted for themselves are not in those indexes,
+    # so the chat list scales with friend count, not history size, even for
+    # conversations cleared with "delete chat".
+    columns = (
+        models.chatting.id,
+        models.chatting.ciphertext,
+        models.chatting.iv,
+        models.chatting.crypto_version,
+        models.chatting.is_deleted_for_everyone,
+        models.chatting.created_at,
+    )
+    last_sent = (
+        select(*columns)
+        .where(
+            models.chatting.sender_id == user_id,
+            models.chatting.receiver_id == models.Friend.friend_id,
+            models.chatting.deleted_for_sender.is_(False),
+        )
+        .order_by(models.chatting.id.desc())
+        .limit(1)
+        .correlate(models.Friend)
+    )
+    last_received = (
+        select(*columns)
+        .where(
+            models.chatting.receiver_id == user_id,
+            models.chatting.sender_id == models.Friend.friend_id,
+            models.chatting.deleted_for_receiver.is_(False),
+        )
+        .order_by(models.chatting.id.desc())
+        .limit(1)
+        .correlate(models.Friend)
+    )
+    latest = union_all(last_sent, last_received).subquery("latest_visible")
+    last_message = select(latest).order_by(latest.c.id.desc()).limit(1).lateral("last_message")
+    return db.execute(
+        select(
+            *USER_SUMMARY_COLUMNS,
+            last_message.c.id,
+            last_message.c.ciphertext,
+            last_message.c.iv,
+            last_message.c.crypto_version,
+            last_message.c.is_deleted_for_everyone,
+            last_message.c.created_at,
+        )
+        .join(models.Friend, models.Friend.friend_id == models.User.id)
+        .outerjoin(last_message, true())
+        .where(models.Friend.owner_id == user_id)
+        .order_by(last_message.c.created_at.desc().nulls_last(), last_message.c.id.desc())
+    ).all()
+
+
+def message_rows(
+    db: Session,
+    user_id: int,
+    friend_id: int,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    limit: int | None = None,
+) -> list[Row]:
+    # MESSAGE_COLUMNS of the messages visible to the user, oldest first.
+    # - before_id: the `limit` newest messages older than before_id
+    # - after_id: the `limit` oldest messages newer than after_id
+    # - neither: the `limit` newest messages (the full history when limit is None)
+    query = select(*MESSAGE_COLUMNS).where(
+        conversation_filter(user_id, friend_id),
+        visible_for_user_filter(user_id),
+    )
+    if after_id is not None:
+        query = query.where(models.chatting.id > after_id)
+    if before_id is not None:
+        query = query.where(models.chatting.id < before_id)
+
+    if limit is None:
+        return db.execute(query.order_by(models.chatting.id.asc())).all()
+    if after_id is not None:
+        return db.execute(query.order_by(models.chatting.id.asc()).limit(limit)).all()
+    rows = db.execute(query.order_by(models.chatting.id.desc()).limit(limit)).all()
+    rows.reverse()
+    return rows
+
+
+def message_change_rows(db: Session, user_id: int, friend_id: int, changed_after: datetime) -> list[Row]:
+    # MESSAGE_COLUMNS plus deleted_for_sender / deleted_for_receiver of every
+    # message in the conversation updated after `changed_after`, oldest first.
+    return db.execute(
+        select(
+            *MESSAGE_COLUMNS,
+            models.chatting.deleted_for_sender,
+            models.chatting.deleted_for_receiver,
+        )
+        .where(
+            conversation_filter(user_id, friend_id),
+            models.chatting.updated_at > changed_after,
+        )
+        .order_by(models.chatting.id.asc())
+    ).all()
@@ -1,8 +1,11 @@
 import os
+from typing import Any, Callable, TypeVar
 
+import anyio
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from ..configaration.config import settings
 from ..configaration.env_loader import ENVIRONMENT
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -17,6 +20,9 @@ if not DATABASE_URL:
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_seconds,
     connect_args={"sslmode": "require"} if ENVIRONMENT == "production" else {"sslmode": "disable"},
 )
 
@@ -35,3 +41,31 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+T = TypeVar("T")
+
+# Caps concurrent offloaded DB calls so async handlers cannot queue more
+# threads than the connection pool can serve.
+_db_thread_limiter: anyio.CapacityLimiter | None = None
+
+
+def _get_db_thread_limiter() -> anyio.CapacityLimiter:
+    global _db_thread_limiter
+    if _db_thread_limiter is None:
+        _db_thread_limiter = anyio.CapacityLimiter(settings.db_pool_size + settings.db_max_overflow)
+    return _db_thread_limiter
+
+
+async def run_db(fn: Callable[..., T], *args: Any) -> T:
+    # Run `fn(db, *args)` in a worker thread with a short-lived session, so
+    # async handlers (e.g. the WebSocket loop) never block the event loop and
+    # only hold a pooled connection for the duration of one unit of work.
+    def _call() -> T:
+        db = SessionLocal()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    return await anyio.to_thread.run_sync(_call, limiter=_get_db_thread_limiter())
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+import anyio
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from ..configaration.config import settings
+from ..mailer import EmailTemplate, mailer
+from . import database, models
+
+logger = logging.getLogger(__name__)
+
+# How often each worker deletes expired and long-failed outbox rows.
+PURGE_INTERVAL_SECONDS = 60.0
+
+
+def enqueue_email(
+    db: Session,
+    recipient: str,
+    template: EmailTemplate,
+    expires_at: datetime | None = None,
+    **values: Any,
+) -> None:
+    # Render `template` and queue the email in the caller's transaction. It is
+    # delivered by the outbox worker once that transaction commits; call
+    # `email_outbox.notify()` after the commit to skip the poll delay. Pass
+    # `expires_at` when the email is useless after some time (e.g. it carries
+    # a one-time code): it is not sent or retried past that point.
+    subject, body = template.render(**values)
+    db.add(models.EmailOutbox(recipient=recipient, subject=subject, body=body, expires_at=expires_at))
+
+
+def _claim_batch(db: Session, limit: int, lease_seconds: float) -> list[Row]:
+    # Lease up to `limit` due rows. SKIP LOCKED lets every worker process claim
+    # disjoint batches; a claimed row becomes due again when its lease runs out,
+    # so a crash mid-send means a retry (at-least-once delivery), never a loss.
+    outbox = models.EmailOutbox
+    rows = db.execute(
+        select(outbox.id, outbox.recipient, outbox.subject, outbox.body, outbox.attempts)
+        .where(
+            outbox.status == "pending",
+            outbox.next_attempt_at <= func.now(),
+            or_(outbox.expires_at.is_(None), outbox.expires_at > func.now()),
+        )
+        .order_by(outbox.next_attempt_at, outbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    if rows:
+        db.execute(
+            update(outbox)
+            .where(outbox.id.in_([row.id for row in rows]))
+            .values(
+                attempts=outbox.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=lease_seconds),
+            )
+        )
+    db.commit()
+    return rows
+
+
+def _finish_batch(
+    db: Session,
+    sent_ids: list[int],
+    failures: list[tuple[int, int, str]],
+    max_attempts: int,
+    retry_base_seconds: float,
+    retry_max_seconds: float,
+) -> None:
+    # Drop sent rows; reschedule failed ones with exponential backoff, or mark
+    # them failed once `max_attempts` is reached.
+    outbox = models.EmailOutbox
+    if sent_ids:
+        db.execute(delete(outbox).where(outbox.id.in_(sent_ids)))
+    for outbox_id, attempts, error in failures:
+        values: dict[str, Any] = {"last_error": error[:500]}
+        if attempts >= max_attempts:
+            values["status"] = "failed"
+        else:
+            delay = min(retry_max_seconds, retry_base_seconds * 2 ** (attempts - 1))
+            values["next_attempt_at"] = func.now() + timedelta(seconds=delay)
+        db.execute(update(outbox).where(outbox.id == outbox_id).values(**values))
+    db.commit()
+
+
+def _purge(db: Session, failed_retention_seconds: float) -> int:
+    # Delete rows past their expiry (their code no longer works) and failed
+    # rows older than the retention period, so undeliverable codes do not
+    # pile up in the table.
+    outbox = models.EmailOutbox
+    result = db.execute(
+        delete(outbox).where(
+            or_(
+                outbox.expires_at <= func.now(),
+                and_(
+                    outbox.status == "failed",
+                    outbox.created_at <= func.now() - timedelta(seconds=failed_retention_seconds),
+                ),
+            )
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+class EmailOutboxWorker:
+    # Background delivery of the email outbox (one per worker process).
+    # Claims due rows in batches, splits each batch across the mailer's
+    # pooled SMTP sessions (one thread per session) and records the outcome.
+    # Wakes up on `notify()` from this process, otherwise polls every
+    # `poll_seconds` (rows queued by other processes, retries coming due).
+    # Every PURGE_INTERVAL_SECONDS it also deletes expired rows and failed
+    # ones older than `failed_retention_seconds`.
+    # Points at settings.smtp_host/port, so a local SMTP stand-in such as
+    # aiosmtpd can receive the mail in tests.
+    def __init__(
+        self,
+        batch_size: int = 50,
+        poll_seconds: float = 2.0,
+        retry_base_seconds: float = 10.0,
+        retry_max_seconds: float = 900.0,
+        max_attempts: int = 8,
+        lease_seconds: float = 120.0,
+        failed_retention_seconds: float = 86400.0,
+    ) -> None:
+        self._batch_size = max(1, batch_size)
+        self._poll_seconds = poll_seconds
+        self._retry_base_seconds = retry_base_seconds
+        self._retry_max_seconds = retry_max_seconds
+        self._max_attempts = max(1, max_attempts)
+        self._lease_seconds = lease_seconds
+        self._failed_retention_seconds = failed_retention_seconds
+        self._purged_at: float | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.failed = 0
+        self.purged = 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await anyio.to_thread.run_sync(mailer.close_idle)
+        self._loop = None
+
+    def notify(self) -> None:
+        # Wake the worker after committing new outbox rows; safe from any thread.
+        loop, wakeup = self._loop, self._wakeup
+        if loop is None or wakeup is None or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(wakeup.set)
+
+    def stats(self) -> dict[str, int]:
+        return {"sent": self.sent, "failed": self.failed, "purged": self.purged}
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                claimed = await self._process_batch()
+            except Exception:
+                logger.exception("Email outbox batch failed")
+                claimed = 0
+            await self._purge_if_due()
+            if claimed >= self._batch_size:
+                continue
+            if claimed == 0:
+                # Nothing due: release the SMTP connections while idle.
+                await anyio.to_thread.run_sync(mailer.close_idle)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _purge_if_due(self) -> None:
+        now = time.monotonic()
+        if self._purged_at is not None and now - self._purged_at < PURGE_INTERVAL_SECONDS:
+            return
+        self._purged_at = now
+        try:
+            purged = await database.run_db(_purge, self._failed_retention_seconds)
+        except Exception:
+            logger.exception("Purging the email outbox failed")
+            return
+        if purged:
+            logger.info("Purged %d expired or failed email outbox rows", purged)
+            self.purged += purged
+
+    async def _process_batch(self) -> int:
+        rows = await database.run_db(_claim_batch, self._batch_size, self._lease_seconds)
+        if not rows:
+            return 0
+        # rows[i::n] keeps each session's share in claim order.
+        sessions = min(mailer.pool_size, len(rows))
+        results = await asyncio.gather(
+            *(anyio.to_thread.run_sync(self._deliver, rows[i::sessions]) for i in range(sessions))
+        )
+        sent_ids = [outbox_id for sent, _ in results for outbox_id in sent]
+        failures = [failure for _, failed in results for failure in failed]
+        await database.run_db(
+            _finish_batch,
+            sent_ids,
+            failures,
+            self._max_attempts,
+            self._retry_base_seconds,
+            self._retry_max_seconds,
+        )
+        self.sent += len(sent_ids)
+        self.failed += len(failures)
+        return len(rows)
+
+    def _deliver(self, rows: list[Row]) -> tuple[list[int], list[tuple[int, int, str]]]:
+        results = mailer.send_batch([(row.recipient, row.subject, row.body) for row in rows])
+        sent_ids: list[int] = []
+        failures: list[tuple[int, int, str]] = []
+        for row, error in zip(rows, results):
+            if error is None:
+                sent_ids.append(row.id)
+            else:
+                # `attempts` was read before the claim incremented it.
+                failures.append((row.id, row.attempts + 1, repr(error)))
+        return sent_ids, failures
+
+
+# Shared per-process outbox worker, started in the app lifespan.
+email_outbox = EmailOutboxWorker(
+    batch_size=settings.email_outbox_batch_size,
+    poll_seconds=settings.email_outbox_poll_seconds,
+    retry_base_seconds=settings.email_outbox_retry_base_seconds,
+    retry_max_seconds=settings.email_outbox_retry_max_seconds,
+    max_attempts=settings.email_outbox_max_attempts,
+    lease_seconds=settings.email_outbox_lease_seconds,
+    failed_retention_seconds=settings.email_outbox_failed_retention_seconds,
+)
@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from ..configaration.config import settings
+from . import models
+
+
+class FriendshipCache:
+    # Per-worker cache of friend-id sets keyed by owner id, so the hot-path
+    # friendship check is a set lookup instead of a query. Entries are dropped
+    # on friendship changes (locally and, via pub/sub, on every other worker).
+    # Pub/sub delivery is best-effort, so entries also expire after
+    # `ttl_seconds`: a lost invalidation is stale for at most that long.
+    def __init__(self, max_users: int = 10000, ttl_seconds: float = 30.0) -> None:
+        self._max_users = max(1, max_users)
+        self._ttl_seconds = ttl_seconds
+        # owner id -> (expires_at, friend ids)
+        self._friends: OrderedDict[int, tuple[float, frozenset[int]]] = OrderedDict()
+        # Bumped on invalidation so a load racing with it is not stored.
+        self._generations: dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, owner_id: int, friend_id: int) -> bool | None:
+        # Cached answer, or None when the owner's friend set is not loaded.
+        with self._lock:
+            entry = self._friends.get(owner_id)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._friends.pop(owner_id, None)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._friends.move_to_end(owner_id)
+            self.hits += 1
+            return friend_id in entry[1]
+
+    def is_friend(self, db: Session, owner_id: int, friend_id: int) -> bool:
+        known = self.lookup(owner_id, friend_id)
+        if known is not None:
+            return known
+        return friend_id in self.load(db, owner_id)
+
+    def invalidate(self, *owner_ids: int) -> None:
+        with self._lock:
+            for owner_id in owner_ids:
+                self._friends.pop(owner_id, None)
+                self._generations[owner_id] = self._generations.get(owner_id, 0) + 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "cached_users": len(self._friends),
+            }
+
+    def load(self, db: Session, owner_id: int) -> frozenset[int]:
+        # Query and cache the owner's friend ids (counted as part of a miss).
+        with self._lock:
+            generation = self._generations.get(owner_id, 0)
+        expires_at = time.monotonic() + self._ttl_seconds
+        friend_ids = frozenset(
+            row.friend_id
+            for row in (
+                db.query(models.Friend.friend_id)
+                .filter(models.Friend.owner_id == owner_id)
+                .all()
+            )
+        )
+        with self._lock:
+            if self._generations.get(owner_id, 0) == generation:
+                self._friends[owner_id] = (expires_at, friend_ids)
+                self._friends.move_to_end(owner_id)
+                while len(self._friends) > self._max_users:
+                    evicted_id, _ = self._friends.popitem(last=False)
+                    self._generations.pop(evicted_id, None)
+        return friend_ids
+
+
+# Shared per-worker friendship cache.
+friendship_cache = FriendshipCache(
+    max_users=settings.friendship_cache_max_users,
+    ttl_seconds=settings.friendship_cache_ttl_seconds,
+)
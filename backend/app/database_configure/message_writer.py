@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from typing import Any
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from ..configaration.config import settings
+from . import database, models
+
+logger = logging.getLogger(__name__)
+
+
+def _insert_messages(db: Session, rows: list[dict[str, Any]]) -> list[Row]:
+    # One multi-row INSERT ... RETURNING and a single commit for the whole batch.
+    table = models.chatting.__table__
+    statement = insert(table).returning(*table.c, sort_by_parameter_order=True)
+    stored = db.execute(statement, rows).all()
+    db.commit()
+    return stored
+
+
+class MessageBatchWriter:
+    # Write-behind pipeline for new chat messages (group commit).
+    # Messages submitted within `window_seconds` of each other are stored in
+    # one statement/transaction; each caller resumes only once its row is
+    # durable, so fan-out never announces a message that could be lost.
+    def __init__(self, window_seconds: float = 0.005, max_batch: int = 200) -> None:
+        self._window_seconds = window_seconds
+        self._max_batch = max(1, max_batch)
+        self._pending: list[tuple[dict[str, Any], asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+
+    async def submit(self, sender_id: int, receiver_id: int, ciphertext: str, iv: str) -> Row:
+        # Queue a message and wait for its stored row (id, created_at, ...).
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(
+            (
+                {
+                    "sender_id": sender_id,
+                    "receiver_id": receiver_id,
+                    "ciphertext": ciphertext,
+                    "iv": iv,
+                },
+                future,
+            )
+        )
+        if len(self._pending) >= self._max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._window_seconds, self._flush)
+        return await future
+
+    async def stop(self) -> None:
+        # Flush anything still pending and wait for in-flight batches.
+        self._flush()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._write(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _write(self, batch: list[tuple[dict[str, Any], asyncio.Future]]) -> None:
+        try:
+            stored = await database.run_db(_insert_messages, [row for row, _ in batch])
+        except Exception:
+            if len(batch) == 1:
+                _, future = batch[0]
+                logger.exception("Could not store chat message")
+                if not future.done():
+                    future.set_exception(RuntimeError("Could not store chat message"))
+                return
+            # Retry row by row so one bad message cannot fail the whole batch;
+            # one after another, so ids still follow submission order.
+            logger.warning("Batch insert of %d messages failed; retrying individually", len(batch))
+            for item in batch:
+                await self._write([item])
+            return
+
+        for (_, future), stored_row in zip(batch, stored):
+            if not future.done():
+                future.set_result(stored_row)
+
+
+# Shared writer used by the WebSocket loop and the HTTP send endpoint.
+message_writer = MessageBatchWriter(
+    window_seconds=settings.message_batch_window_ms / 1000,
+    max_batch=settings.message_batch_max_size,
+)
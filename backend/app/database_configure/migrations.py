@@ -0,0 +1,70 @@
+import logging
+
+from ..configaration.env_loader import BACKEND_ROOT
+from . import models
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI_PATH = BACKEND_ROOT / "alembic.ini"
+SCHEMA_CHECK_MODES = ("off", "warn", "strict")
+
+# Alembic is imported lazily: only the migrate command and an enabled startup
+# schema check need it, so regular worker imports stay cheap.
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    return Config(str(ALEMBIC_INI_PATH))
+
+
+def upgrade_to_head() -> None:
+    # Apply all pending migrations (run once per deploy, not per worker).
+    from alembic import command
+
+    command.upgrade(_alembic_config(), "head")
+
+
+def create_tables() -> None:
+    # DB_AUTO_CREATE_TABLES for quick local setups: create the current schema
+    # directly on an unversioned database and stamp it as the latest
+    # revision, so a later `python -m app.migrate` does not try to create the
+    # same tables again. Databases already under Alembic are left to it.
+    from alembic import command
+
+    current, _ = schema_revisions()
+    if current is not None:
+        return
+    models.Base.metadata.create_all(engine)
+    command.stamp(_alembic_config(), "head")
+
+
+def schema_revisions() -> tuple[str | None, str | None]:
+    # (revision stored in the database, latest revision shipped with the code).
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    with engine.connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+    head = ScriptDirectory.from_config(_alembic_config()).get_current_head()
+    return current, head
+
+
+def check_schema(mode: str) -> None:
+    # Read-only startup check: "warn" logs a pending migration, "strict" refuses to start.
+    normalized = (mode or "off").strip().lower()
+    if normalized not in SCHEMA_CHECK_MODES:
+        raise RuntimeError(f"Unknown schema check mode '{mode}' (expected off, warn or strict)")
+    if normalized == "off":
+        return
+    current, head = schema_revisions()
+    if current == head:
+        return
+    message = (
+        f"Database schema is at revision {current or 'none'} but the code expects {head}; "
+        "run `python -m app.migrate` from backend/"
+    )
+    if normalized == "strict":
+        raise RuntimeError(message)
+    logger.warning(message)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Boolean, UniqueConstraint
+from sqlalchemy import DDL, Column, ForeignKey, Index, Integer, String, Boolean, UniqueConstraint, event, func
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 from sqlalchemy.sql.expression import text
@@ -28,6 +28,28 @@ class User(Base):
     verification = relationship("UserVerified", back_populates="user", uselist=False)
     password_reset = relationship("PasswordReset", back_populates="user", uselist=False)
 
+    __table_args__ = (
+        # Trigram indexes behind the ILIKE '%q%' user search (requires pg_trgm).
+        Index(
+            "ix_users_username_trgm",
+            "username",
+            postgresql_using="gin",
+            postgresql_ops={"username": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_users_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_users_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+    )
+
 
 class UserVerified(Base):
     # ORM model for verified users.
@@ -72,6 +94,42 @@ class chatting(Base):
     # Set when sender edits encrypted content.
     edited_at = Column(TIMESTAMP(timezone=True), nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    # Bumped on every edit/delete so reconnecting clients can fetch only changes.
+    updated_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+
+    __table_args__ = (
+        # Direction-independent conversation key; serves keyset pagination by id
+        # and delta sync by updated_at with a single index range scan. Other
+        # dialects (e.g. SQLite) have no least()/greatest(), so skip them there.
+        Index(
+            "ix_chatting_conversation_id",
+            func.least(sender_id, receiver_id),
+            func.greatest(sender_id, receiver_id),
+            id,
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_chatting_conversation_updated_at",
+            func.least(sender_id, receiver_id),
+            func.greatest(sender_id, receiver_id),
+            updated_at,
+        ).ddl_if(dialect="postgresql"),
+        # Newest message still visible to each side, for the chat list; rows
+        # "deleted for me" (e.g. a cleared chat) are left out of the index.
+        Index(
+            "ix_chatting_sender_visible",
+            sender_id,
+            receiver_id,
+            id,
+            postgresql_where=deleted_for_sender.is_(False),
+        ),
+        Index(
+            "ix_chatting_receiver_visible",
+            receiver_id,
+            sender_id,
+            id,
+            postgresql_where=deleted_for_receiver.is_(False),
+        ),
+    )
 
 
 class Friend(Base):
@@ -84,6 +142,7 @@ class Friend(Base):
 
     __table_args__ = (
         UniqueConstraint("owner_id", "friend_id", name="uq_friend_owner_friend"),
+        Index("ix_friends_friend_id", "friend_id"),
     )
 
 
@@ -103,4 +162,55 @@ class FriendRequest(Base):
 
     __table_args__ = (
         UniqueConstraint("sender_id", "receiver_id", name="uq_friend_request_sender_receiver"),
+        # Pending incoming / outgoing request lists.
+        Index(
+            "ix_friend_requests_receiver_pending",
+            receiver_id,
+            created_at,
+            postgresql_where=status == "pending",
+        ),
+        Index(
+            "ix_friend_requests_sender_pending",
+            sender_id,
+            created_at,
+            postgresql_where=status == "pending",
+        ),
     )
+
+
+class EmailOutbox(Base):
+    # Durable queue of outgoing emails, delivered by the outbox worker.
+    # Rows are deleted once sent; rows that exhaust their retries stay as failed
+    # until purged. Rows past expires_at (e.g. the code they carry has expired)
+    # are no longer sent and are purged as well.
+    __tablename__ = "email_outbox"
+    id = Column(Integer, primary_key=True, nullable=False)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(String, nullable=False)
+    # Supported values: pending, failed.
+    status = Column(String, nullable=False, server_default=text("'pending'"))
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+    next_attempt_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    last_error = Column(String, nullable=True)
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Due pending rows, oldest first.
+        Index(
+            "ix_email_outbox_pending_due",
+            next_attempt_at,
+            id,
+            postgresql_where=status == "pending",
+        ),
+    )
+
+
+# The trigram indexes on users need pg_trgm before create_all builds them
+# (PostgreSQL only; other dialects skip the postgresql_* index options).
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from ..configaration.config import settings
+from . import database, models
+
+logger = logging.getLogger(__name__)
+
+
+class UsernamePrefixIndex:
+    # Optional per-worker index for very short search queries, where a trigram
+    # index cannot help (fewer than 3 chars). It keeps only the first
+    # `max_results` user ids (by lower-cased username, code point order) for
+    # each `prefix_length`-char prefix, so its size follows the number of
+    # distinct prefixes, not the number of users. Rebuilt in a background
+    # thread with its own session once older than `refresh_seconds`; lookups
+    # never wait for it, and users created since the last rebuild only show
+    # up after the next one.
+    def __init__(self, refresh_seconds: float = 300.0, prefix_length: int = 2, max_results: int = 50) -> None:
+        self._refresh_seconds = refresh_seconds
+        self._prefix_length = prefix_length
+        self._max_results = max_results
+        # Lower-cased prefix -> user ids, exact match first; swapped atomically.
+        self._entries: dict[str, tuple[int, ...]] | None = None
+        self._built_at: float | None = None
+        self._rebuild_lock = threading.Lock()
+
+    def lookup(self, prefix: str, limit: int, exclude_id: int | None = None) -> list[int] | None:
+        # User ids whose username starts with `prefix`, exact match first, or
+        # None when the index cannot answer (not built yet, or a prefix of
+        # another length) and the caller should query the database instead.
+        self._refresh_if_stale()
+        entries = self._entries
+        if entries is None or len(prefix) != self._prefix_length:
+            return None
+        user_ids = [user_id for user_id in entries.get(prefix.lower(), ()) if user_id != exclude_id]
+        return user_ids[:limit]
+
+    def rebuild(self) -> None:
+        # Synchronous rebuild (e.g. to warm the index); waits for one in progress.
+        self._rebuild_lock.acquire()
+        self._rebuild()
+
+    def _is_fresh(self) -> bool:
+        built_at = self._built_at
+        return built_at is not None and time.monotonic() - built_at < self._refresh_seconds
+
+    def _refresh_if_stale(self) -> None:
+        if self._is_fresh():
+            return
+        # One rebuild at a time; re-checked under the lock in case another
+        # thread's rebuild finished since the first check.
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+        if self._is_fresh():
+            self._rebuild_lock.release()
+            return
+        threading.Thread(target=self._rebuild, name="username-prefix-index", daemon=True).start()
+
+    def _rebuild(self) -> None:
+        # Runs with _rebuild_lock held. The database ranks usernames per
+        # prefix and returns at most `max_results` rows for each.
+        lowered = func.lower(models.User.username)
+        prefix = func.left(lowered, self._prefix_length)
+        ranked = (
+            select(
+                prefix.label("prefix"),
+                models.User.id,
+                func.row_number()
+                .over(partition_by=prefix, order_by=(lowered.collate("C"), models.User.id))
+                .label("position"),
+            )
+            .where(func.length(models.User.username) >= self._prefix_length)
+            .subquery()
+        )
+        db = database.SessionLocal()
+        try:
+            rows = db.execute(
+                select(ranked.c.prefix, ranked.c.id)
+                .where(ranked.c.position <= self._max_results)
+                .order_by(ranked.c.prefix, ranked.c.position)
+            ).all()
+            entries: dict[str, list[int]] = {}
+            for key, user_id in rows:
+                entries.setdefault(key, []).append(user_id)
+            self._entries = {key: tuple(user_ids) for key, user_ids in entries.items()}
+        except Exception:
+            # Keep serving the previous snapshot (or the database fallback).
+            logger.exception("Rebuilding the username prefix index failed")
+        finally:
+            db.close()
+            # Also set on failure, so a broken database is retried once per
+            # refresh interval instead of on every search.
+            self._built_at = time.monotonic()
+            self._rebuild_lock.release()
+
+
+# Shared per-worker index (only consulted when enabled in settings).
+username_prefix_index = UsernamePrefixIndex(
+    refresh_seconds=settings.user_search_prefix_index_refresh_seconds,
+)
@@ -0,0 +1,47 @@
+import argparse
+import subprocess
+import sys
+
+# Import-time profile of the app, without any CI setup:
+#   cd backend && python -m app.importtime [--top 25] [--module app.main]
+# Wraps `python -X importtime` and lists the slowest imports by cumulative time.
+# The same environment variables as the server are needed (settings load on import).
+
+
+def profile_imports(module: str) -> list[tuple[int, int, str]]:
+    # (self_us, cumulative_us, module name) for every import, in load order.
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # column header
+        entries.append((int(fields[0]), int(fields[1]), fields[2].strip()))
+    return entries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show the slowest imports of a module.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    entries = profile_imports(args.module)
+    total = max((cumulative for _, cumulative, _ in entries), default=0)
+    print(f"{args.module}: {total / 1000:.1f} ms total import time")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for self_us, cumulative_us, name in sorted(entries, key=lambda entry: -entry[1])[: args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
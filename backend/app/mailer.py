@@ -0,0 +1,220 @@
+import logging
+import queue
+import string
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from .configaration.config import settings
+
+logger = logging.getLogger(__name__)
+
+SMTP_TIMEOUT_SECONDS = 30.0
+
+
+class EmailTemplate:
+    # Subject plus a `string.Template` body, compiled once at import.
+    __slots__ = ("subject", "_body")
+
+    def __init__(self, subject: str, body: str) -> None:
+        self.subject = subject
+        self._body = string.Template(body)
+
+    def render(self, **values: Any) -> tuple[str, str]:
+        # (subject, body) with every $placeholder filled in.
+        return self.subject, self._body.substitute(values)
+
+
+VERIFICATION_EMAIL = EmailTemplate(
+    "Verify your email",
+    "Your verification code is $code. It expires in $expire_minutes minutes.",
+)
+PASSWORD_RESET_EMAIL = EmailTemplate(
+    "Reset your password",
+    "Your password reset code is $code. It expires in $expire_minutes minutes.",
+)
+
+
+class _SMTPSession:
+    # One SMTP connection (TCP + STARTTLS + login) reused for many emails.
+    # Reopened when the relay drops it, and after `max_messages` emails since
+    # relays commonly cap (or throttle) messages per connection.
+    def __init__(self, metrics: "MailerMetrics", max_messages: int) -> None:
+        self._metrics = metrics
+        self._max_messages = max(1, max_messages)
+        self._server: Any = None
+        self._sent_on_connection = 0
+
+    def send(self, recipient: str, subject: str, body: str) -> None:
+        # Imported on first use; the SMTP/email stack is not needed to serve requests.
+        import smtplib
+        from email.message import EmailMessage
+
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = settings.smtp_from_email
+        message["To"] = recipient
+        message.set_content(body)
+
+        if self._sent_on_connection >= self._max_messages:
+            self.close()
+        for attempt in range(2):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(message)
+                self._sent_on_connection += 1
+                return
+            except smtplib.SMTPServerDisconnected:
+                # Idle connections get closed by the relay; reconnect once.
+                self._server = None
+                if attempt:
+                    raise
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+    def _connect(self) -> Any:
+        import smtplib
+
+        if not settings.smtp_host or not settings.smtp_from_email:
+            raise RuntimeError("SMTP is not configured")
+        server = smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=SMTP_TIMEOUT_SECONDS)
+        try:
+            if settings.smtp_use_tls:
+                server.starttls()
+            if settings.smtp_user and settings.smtp_password:
+                server.login(settings.smtp_user, settings.smtp_password)
+        except Exception:
+            server.close()
+            raise
+        self._sent_on_connection = 0
+        self._metrics.connection_opened()
+        return server
+
+
+class MailerMetrics:
+    # Delivery counters plus a one-minute sliding throughput window.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+        self._send_seconds = 0.0
+        # Per-second (second, count) buckets covering the last minute.
+        self._recent: deque[list[int]] = deque()
+
+    def connection_opened(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+    def record(self, ok: bool, seconds: float) -> None:
+        now = int(time.monotonic())
+        with self._lock:
+            self._send_seconds += seconds
+            if not ok:
+                self.failed += 1
+                return
+            self.sent += 1
+            if self._recent and self._recent[-1][0] == now:
+                self._recent[-1][1] += 1
+            else:
+                self._recent.append([now, 1])
+            self._prune(now)
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            self._prune(int(time.monotonic()))
+            attempts = self.sent + self.failed
+            return {
+                "sent": self.sent,
+                "failed": self.failed,
+                "connections_opened": self.connections_opened,
+                "sent_last_minute": sum(count for _, count in self._recent),
+                "avg_send_ms": self._send_seconds * 1000 / attempts if attempts else 0.0,
+            }
+
+    def _prune(self, now: int) -> None:
+        while self._recent and self._recent[0][0] <= now - 60:
+            self._recent.popleft()
+
+
+class Mailer:
+    # Shared SMTP sender. Keeps up to `pool_size` persistent sessions; each
+    # `send_batch` call checks one out and sends its emails back to back over
+    # it, so concurrent batches use separate connections and bursts never
+    # open more than `pool_size` sockets to the relay.
+    def __init__(self, pool_size: int = 4, max_messages_per_connection: int = 100) -> None:
+        self.pool_size = max(1, pool_size)
+        self._max_messages = max_messages_per_connection
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._idle: queue.LifoQueue[_SMTPSession] = queue.LifoQueue()
+        self.metrics = MailerMetrics()
+
+    def send_batch(self, emails: list[tuple[str, str, str]]) -> list[Exception | None]:
+        # Send (recipient, subject, body) emails in order; returns the error
+        # for each one (None when sent). A connection-level failure fails the
+        # rest of the batch with the same error instead of reconnecting per email.
+        import smtplib
+
+        results: list[Exception | None] = []
+        with self._session() as session:
+            for index, (recipient, subject, body) in enumerate(emails):
+                started = time.perf_counter()
+                try:
+                    session.send(recipient, subject, body)
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as exc:
+                    # Rejected by the relay: only this email is affected.
+                    logger.warning("SMTP relay rejected email to %s: %s", recipient, exc)
+                    self.metrics.record(False, time.perf_counter() - started)
+                    results.append(exc)
+                except Exception as exc:
+                    logger.warning("SMTP delivery via %s failed: %s", settings.smtp_host, exc)
+                    session.close()
+                    for _ in emails[index:]:
+                        self.metrics.record(False, 0.0)
+                    results.extend(exc for _ in emails[index:])
+                    break
+                else:
+                    self.metrics.record(True, time.perf_counter() - started)
+                    results.append(None)
+        return results
+
+    def close_idle(self) -> None:
+        # Close pooled sessions that are not in use (e.g. when the outbox is empty).
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            session.close()
+
+    def stats(self) -> dict[str, float]:
+        return {**self.metrics.stats(), "pool_size": self.pool_size}
+
+    @contextmanager
+    def _session(self) -> Iterator[_SMTPSession]:
+        with self._slots:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                session = _SMTPSession(self.metrics, self._max_messages)
+            try:
+                yield session
+            finally:
+                self._idle.put(session)
+
+
+# Shared per-process mailer.
+mailer = Mailer(
+    pool_size=settings.smtp_pool_size,
+    max_messages_per_connection=settings.smtp_max_messages_per_connection,
+)
@@ -1,11 +1,23 @@
+# Imported first so the startup timer also covers loading the app modules.
+from .startup import startup_timer
+
+from contextlib import asynccontextmanager
+
+import anyio
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
 
 from .E2EE import crypto
 
-from .database_configure import models
-from .database_configure.database import engine
+from .authentication.user_cache import user_cache
+from .configaration.config import settings
+from .database_configure.email_outbox import email_outbox
+from .database_configure.friendship_cache import friendship_cache
+from .database_configure.message_writer import message_writer
+from .database_configure.migrations import check_schema, create_tables
+from .mailer import mailer
+from .rate_limit import RateLimitMiddleware, create_rate_limit_backend, parse_trusted_proxies
 from .routers import (
     auth,
     chat,
@@ -15,28 +27,44 @@ from .routers import (
     user,
     verification,
 )
+from .Websocket_configure.runtime import manager
 
-# Create DB tables on startup (use Alembic for production migrations).
-models.Base.metadata.create_all(bind=engine)
-
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # No DDL at import time: schema changes go through `python -m app.migrate`.
+    if settings.db_auto_create_tables:
+        await anyio.to_thread.run_sync(create_tables)
+        startup_timer.mark("create_tables")
+    if settings.schema_check != "off":
+        await anyio.to_thread.run_sync(check_schema, settings.schema_check)
+        startup_timer.mark("schema_check")
 
-def ensure_chatting_columns() -> None:
-    # Backfill newer chat columns in existing dev databases.
-    statements = [
-        "ALTER TABLE chatting ADD COLUMN IF NOT EXISTS is_deleted_for_everyone BOOLEAN NOT NULL DEFAULT FALSE",
-        "ALTER TABLE chatting ADD COLUMN IF NOT EXISTS deleted_for_sender BOOLEAN NOT NULL DEFAULT FALSE",
-        "ALTER TABLE chatting ADD COLUMN IF NOT EXISTS deleted_for_receiver BOOLEAN NOT NULL DEFAULT FALSE",
-        "ALTER TABLE chatting ADD COLUMN IF NOT EXISTS edited_at TIMESTAMPTZ",
-    ]
-    with engine.begin() as connection:
-        for statement in statements:
-            connection.execute(text(statement))
+    # Subscribe this worker to cross-worker WebSocket events.
+    await manager.start()
+    startup_timer.mark("websocket_pubsub")
+    # Deliver queued verification / password reset emails in the background.
+    await email_outbox.start()
+    startup_timer.mark("email_outbox")
+    startup_timer.ready = True
+    try:
+        yield
+    finally:
+        startup_timer.ready = False
+        await email_outbox.stop()
+        await message_writer.stop()
+        await manager.stop()
 
 
-ensure_chatting_columns()
-
 # FastAPI application instance.
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Throttle abuse-prone endpoints (added before CORS so 429s still carry CORS headers).
+if settings.rate_limit_enabled:
+    app.add_middleware(
+        RateLimitMiddleware,
+        backend=create_rate_limit_backend(settings.rate_limit_backend, settings.redis_url),
+        trusted_proxies=parse_trusted_proxies(settings.rate_limit_trusted_proxies),
+    )
 
 # Allow the React dev server to call the API.
 origins = ["*", "http://localhost:3000", "http://127.0.0.1:3000"]
@@ -59,9 +87,29 @@ app.include_router(crypto.router)
 app.include_router(verification.router)
 app.include_router(forgotpassword.router)
 app.include_router(messages_ws.router)
+startup_timer.mark("imports")
 
 
 @app.get("/")
 def root():
     # Basic health-check endpoint.
     return 
+
+
+@app.get("/metrics")
+async def metrics():
+    # Per-worker runtime counters.
+    return {
+        "websocket": manager.metrics(),
+        "friendship_cache": friendship_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "email_outbox": email_outbox.stats(),
+        "mailer": mailer.stats(),
+    }
+
+
+@app.get("/ready")
+async def ready():
+    # Readiness probe with per-phase startup timings; 503 while shutting down.
+    report = startup_timer.report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
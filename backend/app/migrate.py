@@ -0,0 +1,8 @@
+from .database_configure.migrations import upgrade_to_head
+
+# Apply database migrations once per deploy, before starting workers:
+#   cd backend && python -m app.migrate
+
+
+if __name__ == "__main__":
+    upgrade_to_head()
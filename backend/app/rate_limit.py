@@ -0,0 +1,292 @@
+import ipaddress
+import json
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+from jose import JWTError, jwt
+
+from .configaration.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimit(NamedTuple):
+    # Token bucket: up to `burst` requests at once, refilled at `per_minute`.
+    burst: int
+    per_minute: float
+
+
+class RateLimitRule(NamedTuple):
+    method: str
+    path: re.Pattern
+    # Bucket name shared by every path of the rule (e.g. the /friends alias).
+    name: str
+    per_ip: RateLimit
+    # Applied on top of per_ip when the request carries a valid bearer token.
+    per_user: RateLimit | None = None
+
+
+# Endpoints that trigger bcrypt, SMTP or search work on demand.
+RATE_LIMIT_RULES = (
+    RateLimitRule("POST", re.compile(r"/login"), "login", RateLimit(20, 10)),
+    RateLimitRule("POST", re.compile(r"/verification/request"), "verification", RateLimit(5, 3)),
+    RateLimitRule("POST", re.compile(r"/password/forgot"), "password_reset", RateLimit(5, 3)),
+    RateLimitRule(
+        "GET", re.compile(r"/users/search"), "user_search", RateLimit(120, 240), RateLimit(30, 60)
+    ),
+    RateLimitRule(
+        "POST",
+        re.compile(r"/(friend-requests|friends)/\d+"),
+        "friend_request",
+        RateLimit(60, 60),
+        RateLimit(20, 20),
+    ),
+)
+
+
+class RateLimitBackend:
+    # Token bucket store shared by the middleware.
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        # Take one token from `key`'s bucket. Returns 0 when allowed, otherwise
+        # the seconds until a token is available (nothing is taken then).
+        raise NotImplementedError
+
+    async def release(self, key: str, limit: RateLimit) -> None:
+        # Give back a token taken by acquire(), e.g. when a later bucket
+        # rejected the same request.
+        raise NotImplementedError
+
+
+class InMemoryRateLimiter(RateLimitBackend):
+    # Per-process buckets; limits apply per worker. Only touched from the event
+    # loop, so no locking. Least recently used buckets are dropped beyond
+    # `max_keys` (a dropped bucket simply starts full again).
+    def __init__(self, max_keys: int = 100000) -> None:
+        self._max_keys = max(1, max_keys)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        now = time.monotonic()
+        rate = limit.per_minute / 60
+        tokens, updated_at = self._buckets.get(key, (limit.burst, now))
+        tokens = min(limit.burst, tokens + (now - updated_at) * rate)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self._max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def release(self, key: str, limit: RateLimit) -> None:
+        state = self._buckets.get(key)
+        if state is not None:
+            tokens, updated_at = state
+            self._buckets[key] = (min(limit.burst, tokens + 1), updated_at)
+
+
+# Atomic token bucket in a Redis hash, using the server clock so every
+# worker/node sees the same time. Returns the retry delay as a string
+# (Lua numbers are truncated to integers in replies).
+_REDIS_TOKEN_BUCKET = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return tostring(retry_after)
+"""
+
+# Returns one token to a bucket that still exists, capped at the burst size.
+_REDIS_TOKEN_RELEASE = """
+local burst = tonumber(ARGV[1])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', math.min(burst, tokens + 1))
+end
+return 1
+"""
+
+
+class RedisRateLimiter(RateLimitBackend):
+    # Buckets shared by all workers and nodes. Any client exposing the
+    # `redis.asyncio` register_script() API can be injected (e.g. fakeredis).
+    # Fails open: if Redis is unavailable requests are let through.
+    def __init__(self, url: str | None = None, client: Any = None, prefix: str = "chitchat:rate:") -> None:
+        if client is None:
+            if not url:
+                raise RuntimeError("REDIS_URL is required for the redis rate limit backend")
+            try:
+                from redis import asyncio as redis_asyncio
+            except ImportError as exc:
+                raise RuntimeError(
+                    "The 'redis' package is required for the redis rate limit backend"
+                ) from exc
+            client = redis_asyncio.from_url(url)
+        self._prefix = prefix
+        self._script = client.register_script(_REDIS_TOKEN_BUCKET)
+        self._release_script = client.register_script(_REDIS_TOKEN_RELEASE)
+
+    async def acquire(self, key: str, limit: RateLimit) -> float:
+        try:
+            retry_after = await self._script(
+                keys=[self._prefix + key], args=[limit.burst, limit.per_minute / 60]
+            )
+        except Exception:
+            logger.warning("Rate limit check failed; allowing request", exc_info=True)
+            return 0.0
+        return float(retry_after)
+
+    async def release(self, key: str, limit: RateLimit) -> None:
+        try:
+            await self._release_script(keys=[self._prefix + key], args=[limit.burst])
+        except Exception:
+            logger.warning("Rate limit release failed", exc_info=True)
+
+
+def create_rate_limit_backend(backend: str, redis_url: str | None = None) -> RateLimitBackend:
+    # Build the configured backend ("memory" or "redis").
+    normalized = (backend or "memory").strip().lower()
+    if normalized == "memory":
+        return InMemoryRateLimiter()
+    if normalized == "redis":
+        return RedisRateLimiter(url=redis_url)
+    raise RuntimeError(f"Unknown rate limit backend '{backend}'")
+
+
+def parse_trusted_proxies(value: str | None) -> tuple[ipaddress.IPv4Network | ipaddress.IPv6Network, ...]:
+    # Comma-separated proxy addresses or networks, e.g. "10.0.0.0/8,127.0.0.1".
+    networks = []
+    for entry in (value or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError as exc:
+            raise RuntimeError(f"Invalid trusted proxy address '{entry}'") from exc
+    return tuple(networks)
+
+
+def _is_trusted(address: str, trusted_proxies: tuple) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+
+def _client_ip(scope: dict, trusted_proxies: tuple) -> str:
+    # The connection peer, unless it is a trusted proxy: then the nearest
+    # X-Forwarded-For address that is not one (proxies append the peer they
+    # saw, so entries left of it can be forged by the client).
+    client = scope.get("client")
+    peer = client[0] if client else "unknown"
+    if not trusted_proxies or not _is_trusted(peer, trusted_proxies):
+        return peer
+    forwarded = []
+    for name, value in scope["headers"]:
+        if name == b"x-forwarded-for":
+            forwarded.extend(address.strip() for address in value.decode("latin-1").split(","))
+    for address in reversed(forwarded):
+        if address and not _is_trusted(address, trusted_proxies):
+            return address
+    return peer
+
+
+def _bearer_user_id(scope: dict) -> int | None:
+    # User id from a valid bearer token, or None.
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            try:
+                payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+                return int(payload["sub"])
+            except (JWTError, KeyError, TypeError, ValueError):
+                return None
+    return None
+
+
+class RateLimitMiddleware:
+    # ASGI middleware applying RATE_LIMIT_RULES before the request reaches
+    # FastAPI. Requests over a limit get an immediate 429 with Retry-After.
+    # The client IP is the connection peer, or X-Forwarded-For when the peer
+    # is one of `trusted_proxies`; without either, every client behind a
+    # reverse proxy shares the proxy's buckets.
+    def __init__(
+        self,
+        app: Any,
+        backend: RateLimitBackend,
+        rules: tuple[RateLimitRule, ...] = RATE_LIMIT_RULES,
+        trusted_proxies: tuple = (),
+    ) -> None:
+        self.app = app
+        self._backend = backend
+        self._rules = rules
+        self._trusted_proxies = trusted_proxies
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] == "http":
+            rule = self._match(scope["method"], scope["path"])
+            if rule is not None:
+                retry_after = await self._check(rule, scope)
+                if retry_after > 0:
+                    await _send_too_many_requests(send, retry_after)
+                    return
+        await self.app(scope, receive, send)
+
+    def _match(self, method: str, path: str) -> RateLimitRule | None:
+        for rule in self._rules:
+            if rule.method == method and rule.path.fullmatch(path):
+                return rule
+        return None
+
+    async def _check(self, rule: RateLimitRule, scope: dict) -> float:
+        ip_key = f"{rule.name}:ip:{_client_ip(scope, self._trusted_proxies)}"
+        retry_after = await self._backend.acquire(ip_key, rule.per_ip)
+        if retry_after > 0 or rule.per_user is None:
+            return retry_after
+        user_id = _bearer_user_id(scope)
+        if user_id is None:
+            return 0.0
+        retry_after = await self._backend.acquire(f"{rule.name}:user:{user_id}", rule.per_user)
+        if retry_after > 0:
+            # Rejected requests should not use up the shared IP bucket.
+            await self._backend.release(ip_key, rule.per_ip)
+        return retry_after
+
+
+async def _send_too_many_requests(send: Any, retry_after: float) -> None:
+    body = json.dumps({"detail": "Too many requests"}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
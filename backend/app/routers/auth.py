@@ -1,5 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, HTTPException, status
 from sqlalchemy import or_
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
 from ..authentication import oauth2, utils
@@ -7,18 +8,21 @@ from ..authentication import oauth2, utils
 from ..database_configure import database, models
 
 from ..schema import Schemas
+from ..Websocket_configure.runtime import publish_user_change
 
 # Auth-related endpoints.
 router = APIRouter(tags=["Authentication"])
 
 
-@router.post("/login", response_model=Schemas.Token)
-def login(user_credentials: Schemas.UserLogin, db: Session = Depends(database.get_db)):
-    # Look up the user by email or username.
-    identifier = user_credentials.email.strip()
-    normalized_email = utils.normalize_email(identifier)
-    user = (
-        db.query(models.User)
+def _load_login_account(db: Session, identifier: str, normalized_email: str) -> Row | None:
+    # Look up the user by email or username, with verification state, in one query.
+    return (
+        db.query(
+            models.User.id,
+            models.User.password,
+            models.UserVerified.is_verified,
+        )
+        .outerjoin(models.UserVerified, models.UserVerified.owner_id == models.User.id)
         .filter(
             or_(
                 models.User.email == normalized_email,
@@ -28,27 +32,48 @@ def login(user_credentials: Schemas.UserLogin, db: Session = Depends(database.ge
         .first()
     )
 
+
+def _replace_password_hash(db: Session, user_id: int, old_hash: str, new_hash: str) -> None:
+    # Only swap the hash if the password was not changed in the meantime.
+    (
+        db.query(models.User)
+        .filter(models.User.id == user_id, models.User.password == old_hash)
+        .update({models.User.password: new_hash}, synchronize_session=False)
+    )
+    db.commit()
+
+
+@router.post("/login", response_model=Schemas.Token)
+async def login(user_credentials: Schemas.UserLogin):
+    # Runs on the event loop: DB work goes to worker threads and bcrypt to the
+    # dedicated hashing pool, so logins never occupy the shared threadpool.
+    identifier = user_credentials.email.strip()
+    normalized_email = utils.normalize_email(identifier)
+    account = await database.run_db(_load_login_account, identifier, normalized_email)
+
     # Reject invalid credentials.
-    if not user or not utils.verify_password(user_credentials.password, user.password):
+    valid, new_hash = False, None
+    if account:
+        valid, new_hash = await utils.verify_and_update_password(
+            user_credentials.password, account.password
+        )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid email/username or password",
         )
 
-    verified = (
-        db.query(models.UserVerified)
-        .filter(
-            models.UserVerified.owner_id == user.id,
-            models.UserVerified.is_verified.is_(True),
-        )
-        .first()
-    )
-    if not verified:
+    # Transparently upgrade hashes made with a deprecated scheme or lower cost.
+    if new_hash:
+        await database.run_db(_replace_password_hash, account.id, account.password, new_hash)
+        publish_user_change(account.id)
+
+    if not account.is_verified:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Email not verified",
         )
 
     # Issue a JWT access token.
-    access_token = oauth2.create_access_token(data={"sub": str(user.id)})
+    access_token = oauth2.create_access_token(data={"sub": str(account.id)})
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,17 +1,23 @@
-import asyncio
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Literal
 
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import and_, case, or_
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, case, func, or_, select
 from sqlalchemy.orm import Session
 
 from ..authentication import oauth2
-from ..database_configure import database, models
+from ..database_configure import chat_queries, database, models
+from ..database_configure.friendship_cache import friendship_cache
+from ..database_configure.message_writer import message_writer
+from ..responses import trusted_json
 from ..serialization import (
+    ChatMessageRecord,
+    ChatThreadRecord,
+    UserSummaryRecord,
+    _encode_json,
     _serialize_chat_message,
-    _serialize_chat_thread,
-    _serialize_user_summary,
     _serialize_ws_conversation_cleared_event,
     _serialize_ws_friend_removed_event,
     _serialize_ws_message_deleted_for_everyone_event,
@@ -20,48 +26,21 @@ from ..serialization import (
     _serialize_ws_message_event,
 )
 from ..schema import Schemas
-from ..Websocket_configure.runtime import manager
+from ..Websocket_configure.runtime import manager, publish_friendship_change
 
 # Chat-related endpoints.
 router = APIRouter(tags=["Chats"])
 
-# Helper function to filter messages between the current user and a specific friend.
-def _conversation_filter(current_user_id: int, friend_id: int):
-    return or_(
-        and_(
-            models.chatting.sender_id == current_user_id,
-            models.chatting.receiver_id == friend_id,
-        ),
-        and_(
-            models.chatting.sender_id == friend_id,
-            models.chatting.receiver_id == current_user_id,
-        ),
-    )
-
-# Helper function to filter messages that are visible to the current user (not deleted for them).
-def _visible_for_user_filter(current_user_id: int):
-    return or_(
-        and_(
-            models.chatting.sender_id == current_user_id,
-            models.chatting.deleted_for_sender.is_(False),
-        ),
-        and_(
-            models.chatting.receiver_id == current_user_id,
-            models.chatting.deleted_for_receiver.is_(False),
-        ),
-    )
+MESSAGE_PAGE_MAX_LIMIT = 500
+# Delta sync looks back this far before `updated_since` so rows committed by
+# transactions that started before the previous sync are not missed.
+MESSAGE_SYNC_OVERLAP = timedelta(seconds=5)
+# Conversation export: messages per streamed chunk.
+MESSAGE_EXPORT_CHUNK_ROWS = 500
 
 # Helper function to ensure the current user has the specified friend.
 def _ensure_friendship(db: Session, current_user_id: int, friend_id: int) -> None:
-    friend = (
-        db.query(models.Friend)
-        .filter(
-            models.Friend.owner_id == current_user_id,
-            models.Friend.friend_id == friend_id,
-        )
-        .first()
-    )
-    if not friend:
+    if not friendship_cache.is_friend(db, current_user_id, friend_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Friend not added",
@@ -69,21 +48,16 @@ def _ensure_friendship(db: Session, current_user_id: int, friend_id: int) -> Non
 
 # Helper function to send WebSocket events to a set of user IDs.
 def _send_ws_event(user_ids: set[int], payload: dict) -> None:
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        asyncio.run(manager.send_to_users(user_ids, payload))
-    else:
-        loop.create_task(manager.send_to_users(user_ids, payload))
+    manager.dispatch(user_ids, payload)
 
 
 # Friend list + encrypted chat endpoints.
 @router.get("/friends", response_model=list[Schemas.FriendOut])
 def list_friends(db: Session = Depends(database.get_db),current_user: models.User = Depends(oauth2.get_current_user),):
     
-    friends = (db.query(models.User).join(models.Friend, models.Friend.friend_id == models.User.id).filter(models.Friend.owner_id == current_user.id).order_by(models.User.username.asc()).all())
+    friends = chat_queries.friend_rows(db, current_user.id)
     
-    return [_serialize_user_summary(friend) for friend in friends]
+    return trusted_json([UserSummaryRecord(*row) for row in friends])
 
 
 @router.delete("/friends/{friend_id}", response_model=Schemas.Message)
@@ -143,6 +117,7 @@ def remove_friend(
         .delete(synchronize_session=False)
     )
     db.commit()
+    publish_friendship_change({current_user.id, friend_id})
 
     # Realtime sync for both users so UIs can refresh lists immediately.
     _send_ws_event(
@@ -154,76 +129,117 @@ def remove_friend(
 
 @router.get("/chats", response_model=list[Schemas.ChatThreadOut])
 def list_chats(db: Session = Depends(database.get_db),current_user: models.User = Depends(oauth2.get_current_user),):
-    
-    friends = (db.query(models.User).join(models.Friend, models.Friend.friend_id == models.User.id).filter(models.Friend.owner_id == current_user.id).all())
-    
-    if not friends:
-        return []
+    rows = chat_queries.chat_thread_rows(db, current_user.id)
+    return trusted_json([ChatThreadRecord.from_row(row) for row in rows])
 
-    friend_ids = [friend.id for friend in friends]
 
-    messages = (
-        db.query(models.chatting)
-        .filter(
-            _visible_for_user_filter(current_user.id),
-            or_(
-                and_(
-                    models.chatting.sender_id == current_user.id,
-                    models.chatting.receiver_id.in_(friend_ids),
-                ),
-                and_(
-                    models.chatting.receiver_id == current_user.id,
-                    models.chatting.sender_id.in_(friend_ids),
-                ),
-            ),
+@router.get("/chats/{friend_id}/messages", response_model=list[Schemas.ChatMessageOut])
+def list_messages(
+    friend_id: int,
+    before_id: int | None = Query(default=None, ge=1),
+    after_id: int | None = Query(default=None, ge=1),
+    limit: int | None = Query(default=None, ge=1, le=MESSAGE_PAGE_MAX_LIMIT),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(oauth2.get_current_user),
+):
+    # Keyset pagination by message id; results are always oldest-first.
+    # - before_id: the `limit` newest messages older than before_id (scroll back)
+    # - after_id: the `limit` oldest messages newer than after_id (catch up)
+    # - neither: the `limit` newest messages (full history when limit is omitted)
+    if before_id is not None and after_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either before_id or after_id, not both",
         )
-        .order_by(models.chatting.created_at.desc())
-        .all()
-    )
 
-    last_by_friend: dict[int, models.chatting] = {}
-    for message in messages:
-        other_id = (
-            message.receiver_id
-            if message.sender_id == current_user.id
-            else message.sender_id
-        )
-        if other_id not in last_by_friend:
-            last_by_friend[other_id] = message
-
-    sorted_friends = sorted(
-        friends,
-        key=lambda friend: (
-            last_by_friend[friend.id].created_at
-            if friend.id in last_by_friend
-            else datetime.min.replace(tzinfo=timezone.utc)
-        ),
-        reverse=True,
+    _ensure_friendship(db, current_user.id, friend_id)
+
+    rows = chat_queries.message_rows(db, current_user.id, friend_id, before_id, after_id, limit)
+    return trusted_json([ChatMessageRecord(*row) for row in rows])
+
+
+def _export_page(db: Session, current_user_id: int, friend_id: int, after_id: int) -> list[ChatMessageRecord]:
+    rows = chat_queries.message_rows(
+        db, current_user_id, friend_id, after_id=after_id, limit=MESSAGE_EXPORT_CHUNK_ROWS
+    )
+    return [ChatMessageRecord(*row) for row in rows]
+
+
+async def _export_chunks(current_user_id: int, friend_id: int, after_id: int | None):
+    # NDJSON chunks of the conversation, one keyset page (by id) per chunk.
+    # Each page is read through run_db with its own short session, so a slow
+    # download holds no pooled connection or transaction between chunks.
+    after_id = after_id or 0
+    while True:
+        records = await database.run_db(_export_page, current_user_id, friend_id, after_id)
+        if not records:
+            return
+        yield b"".join(_encode_json(record) + b"\n" for record in records)
+        if len(records) < MESSAGE_EXPORT_CHUNK_ROWS:
+            return
+        after_id = records[-1].id
+
+
+@router.get("/chats/{friend_id}/messages/export", response_class=StreamingResponse)
+def export_messages(
+    friend_id: int,
+    after_id: int | None = Query(default=None, ge=1),
+    db: Session = Depends(database.get_db),
+    current_user: models.User = Depends(oauth2.get_current_user),
+):
+    # Whole conversation as NDJSON, one ChatMessageOut object per line, oldest
+    # first. Streamed, so memory does not grow with history size; to resume an
+    # interrupted export pass the last received message id as after_id.
+    _ensure_friendship(db, current_user.id, friend_id)
+    # The stream reads through its own sessions; don't keep this one for the
+    # length of the download.
+    db.close()
+    return StreamingResponse(
+        _export_chunks(current_user.id, friend_id, after_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="chat-{friend_id}.ndjson"'},
     )
-    return [
-        _serialize_chat_thread(friend, last_by_friend.get(friend.id))
-        for friend in sorted_friends
-    ]
 
 
-@router.get("/chats/{friend_id}/messages", response_model=list[Schemas.ChatMessageOut])
-def list_messages(
+@router.get(
+    "/chats/{friend_id}/messages/changes",
+    response_model=Schemas.ChatMessageChangesOut,
+)
+def list_message_changes(
     friend_id: int,
+    updated_since: datetime,
     db: Session = Depends(database.get_db),
     current_user: models.User = Depends(oauth2.get_current_user),
 ):
+    # Delta sync for reconnects: new, edited and deleted messages since a time.
     _ensure_friendship(db, current_user.id, friend_id)
 
-    messages = (
-        db.query(models.chatting)
-        .filter(
-            _conversation_filter(current_user.id, friend_id),
-            _visible_for_user_filter(current_user.id),
-        )
-        .order_by(models.chatting.created_at.asc())
-        .all()
+    if updated_since.tzinfo is None:
+        updated_since = updated_since.replace(tzinfo=timezone.utc)
+    synced_at = db.execute(select(func.now())).scalar_one()
+
+    changed = chat_queries.message_change_rows(
+        db, current_user.id, friend_id, updated_since - MESSAGE_SYNC_OVERLAP
     )
-    return [_serialize_chat_message(message) for message in messages]
+
+    messages = []
+    removed_message_ids = []
+    for row in changed:
+        deleted_for_me = (
+            row.deleted_for_sender
+            if row.sender_id == current_user.id
+            else row.deleted_for_receiver
+        )
+        if deleted_for_me:
+            removed_message_ids.append(row.id)
+        else:
+            messages.append(ChatMessageRecord(*row[:-2]))
+
+    return trusted_json({
+        "messages": messages,
+        "removed_message_ids": removed_message_ids,
+        "synced_at": synced_at,
+    })
 
 
 @router.post(
@@ -238,13 +254,14 @@ def send_message(
     current_user: models.User = Depends(oauth2.get_current_user),
 ):
     # HTTP fallback for sending encrypted messages (WebSocket is preferred).
-    if friend_id == current_user.id:
+    current_user_id = current_user.id
+    if friend_id == current_user_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You cannot message yourself",
         )
 
-    _ensure_friendship(db, current_user.id, friend_id)
+    _ensure_friendship(db, current_user_id, friend_id)
 
     message_ciphertext = payload.ciphertext.strip()
     message_iv = payload.iv.strip()
@@ -254,17 +271,27 @@ def send_message(
             detail="Encrypted message payload required",
         )
 
-    new_message = models.chatting(
-        sender_id=current_user.id,
-        receiver_id=friend_id,
-        ciphertext=message_ciphertext,
-        iv=message_iv,
-    )
-    db.add(new_message)
-    db.commit()
-    db.refresh(new_message)
+    # Return this request's pooled connection (checked out on a cache miss)
+    # before waiting on the writer, which needs one of its own; otherwise
+    # concurrent sends can use up the pool and starve the writer.
+    db.close()
 
-    _send_ws_event({current_user.id, friend_id}, _serialize_ws_message_event(new_message))
+    # Hand the insert to the shared group-commit writer on the event loop.
+    try:
+        new_message = anyio.from_thread.run(
+            message_writer.submit,
+            current_user_id,
+            friend_id,
+            message_ciphertext,
+            message_iv,
+        )
+    except RuntimeError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not send message",
+        )
+
+    _send_ws_event({current_user_id, friend_id}, _serialize_ws_message_event(new_message))
     return _serialize_chat_message(new_message)
 
 
@@ -285,7 +312,7 @@ def edit_message(
         db.query(models.chatting)
         .filter(
             models.chatting.id == message_id,
-            _conversation_filter(current_user.id, friend_id),
+            chat_queries.conversation_filter(current_user.id, friend_id),
         )
         .first()
     )
@@ -318,6 +345,7 @@ def edit_message(
     message.ciphertext = next_ciphertext
     message.iv = next_iv
     message.edited_at = datetime.now(timezone.utc)
+    message.updated_at = func.now()
     db.commit()
     db.refresh(message)
 
@@ -342,7 +370,7 @@ def delete_message(
         db.query(models.chatting)
         .filter(
             models.chatting.id == message_id,
-            _conversation_filter(current_user.id, friend_id),
+            chat_queries.conversation_filter(current_user.id, friend_id),
         )
         .first()
     )
@@ -365,6 +393,7 @@ def delete_message(
         message.ciphertext = ""
         message.iv = ""
         message.edited_at = None
+        message.updated_at = func.now()
         db.commit()
 
         _send_ws_event(
@@ -382,6 +411,7 @@ def delete_message(
             return {"message": "Message already deleted from your chat"}
         message.deleted_for_receiver = True
 
+    message.updated_at = func.now()
     db.commit()
     _send_ws_event(
         {current_user.id},
@@ -400,9 +430,13 @@ def delete_friend_chat(
 
     (
         db.query(models.chatting)
-        .filter(_conversation_filter(current_user.id, friend_id))
+        .filter(
+            chat_queries.conversation_filter(current_user.id, friend_id),
+            chat_queries.visible_for_user_filter(current_user.id),
+        )
         .update(
             {
+                models.chatting.updated_at: func.now(),
                 models.chatting.deleted_for_sender: case(
                     (models.chatting.sender_id == current_user.id, True),
                     else_=models.chatting.deleted_for_sender,
@@ -1,20 +1,18 @@
 from datetime import datetime, timedelta, timezone
-import logging
 import random
-import smtplib
-from email.message import EmailMessage
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from ..authentication import utils
-from ..configaration.config import settings
 from ..database_configure import database, models
+from ..database_configure.email_outbox import email_outbox, enqueue_email
+from ..mailer import PASSWORD_RESET_EMAIL
 from ..schema import Schemas
+from ..Websocket_configure.runtime import publish_user_change
 
 # Password reset-related endpoints.
 router = APIRouter(tags=["Password"])
-logger = logging.getLogger(__name__)
 
 PASSWORD_RESET_EXPIRE_MINUTES = 15
 
@@ -24,28 +22,6 @@ def generate_reset_code() -> str:
     return f"{random.randint(100000, 999999)}"
 
 
-def send_reset_email(recipient: str, code: str) -> None:
-    # Send a password reset email via SMTP using configured settings.
-    if not settings.smtp_host or not settings.smtp_from_email:
-        raise RuntimeError("SMTP is not configured")
-
-    message = EmailMessage()
-    message["Subject"] = "Reset your password"
-    message["From"] = settings.smtp_from_email
-    message["To"] = recipient
-    message.set_content(
-        f"Your password reset code is {code}. "
-        f"It expires in {PASSWORD_RESET_EXPIRE_MINUTES} minutes."
-    )
-
-    with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
-        if settings.smtp_use_tls:
-            server.starttls()
-        if settings.smtp_user and settings.smtp_password:
-            server.login(settings.smtp_user, settings.smtp_password)
-        server.send_message(message)
-
-
 @router.post("/password/forgot", response_model=Schemas.Message)
 def request_password_reset(payload: Schemas.PasswordResetRequest,db: Session = Depends(database.get_db),):
     # Create or refresh a password reset code and email it to the user.
@@ -71,20 +47,17 @@ def request_password_reset(payload: Schemas.PasswordResetRequest,db: Session = D
         )
         db.add(reset)
 
-    try:
-        send_reset_email(user.email, code)
-        db.commit()
-    except Exception:
-        db.rollback()
-        logger.exception(
-            "Could not send password reset email to %s via SMTP host %s",
-            user.email,
-            settings.smtp_host,
-        )
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Could not send reset email",
-        )
+    # Code and outbox row commit together; delivery happens off-request.
+    enqueue_email(
+        db,
+        user.email,
+        PASSWORD_RESET_EMAIL,
+        code=code,
+        expire_minutes=PASSWORD_RESET_EXPIRE_MINUTES,
+        expires_at=expires_at,
+    )
+    db.commit()
+    email_outbox.notify()
 
     return {"message": "Password reset code sent"}
 
@@ -135,5 +108,6 @@ def confirm_password_reset(
     reset.code = None
     reset.expires_at = None
     db.commit()
+    publish_user_change(user.id)
 
     return {"message": "Password updated"}
@@ -1,4 +1,3 @@
-import asyncio
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, status
@@ -11,19 +10,14 @@ from ..serialization import (
     _serialize_ws_friend_request_event,
 )
 from ..schema import Schemas
-from ..Websocket_configure.runtime import manager
+from ..Websocket_configure.runtime import manager, publish_friendship_change
 
 # Friend request workflow endpoints.
 router = APIRouter(tags=["Friend Requests"])
 
 # The following helper functions are defined to keep the main endpoint logic clean and focused on the workflow, while still ensuring we have proper serialization and real-time notifications in place.
 def _send_ws_event(user_ids: set[int], payload: dict) -> None:
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        asyncio.run(manager.send_to_users(user_ids, payload))
-    else:
-        loop.create_task(manager.send_to_users(user_ids, payload))
+    manager.dispatch(user_ids, payload)
 
 
 def _is_friend(db: Session, owner_id: int, friend_id: int) -> bool:
@@ -258,6 +252,7 @@ def accept_friend_request(
 
     db.commit()
     db.refresh(friend_request)
+    publish_friendship_change({friend_request.sender_id, friend_request.receiver_id})
 
     # Notify receiver for state sync on their active sessions.
     _send_ws_event(
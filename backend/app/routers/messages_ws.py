@@ -2,7 +2,10 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.orm import Session
 
 from ..authentication import oauth2
-from ..database_configure import database, models
+from ..authentication.user_cache import user_cache
+from ..database_configure import database
+from ..database_configure.friendship_cache import friendship_cache
+from ..database_configure.message_writer import message_writer
 from ..serialization import _serialize_ws_message_event
 from ..Websocket_configure.runtime import manager
 
@@ -10,6 +13,14 @@ from ..Websocket_configure.runtime import manager
 router = APIRouter()
 
 
+# Blocking DB steps of the receive loop; each runs via database.run_db in a
+# worker thread with its own short-lived session, so a slow query never blocks
+# other sockets and idle sockets never hold a pooled connection.
+def _load_user_id(db: Session, user_id: int) -> int | None:
+    user = user_cache.get(db, user_id)
+    return user.id if user else None
+
+
 @router.websocket("/ws/messages")
 async def messages_socket(websocket: WebSocket):
     # Manual auth because WebSocket connections cannot use headers in browsers.
@@ -26,28 +37,33 @@ async def messages_socket(websocket: WebSocket):
         return
 
     # Load user after token validation.
-    db: Session = next(database.get_db())
-    current_user = (db.query(models.User).filter(models.User.id == token_data.id).first())
-    if not current_user:
-        db.close()
+    current_user_id = await database.run_db(_load_user_id, token_data.id)
+    if not current_user_id:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
 
-    await manager.connect(current_user.id, websocket)
-
+    # Clients that handle {"type":"batch","events":[...]} frames opt in with ?batch=1.
+    batch = websocket.query_params.get("batch") in ("1", "true")
+    # Reconnecting clients pass the last "seq" they received to get what they missed.
     try:
+        since = int(websocket.query_params.get("since"))
+    except (TypeError, ValueError):
+        since = None
+    if since is not None and since < 0:
+        since = None
+    try:
+        # Replies go through the connection's queue too, so they share its
+        # ordering and send timeout with the events it delivers.
+        connection = await manager.connect(current_user_id, websocket, batch=batch, since=since)
+
         while True:
             # Expected payload: { type: "message", friend_id, ciphertext, iv }
             payload = await websocket.receive_json()
             if not isinstance(payload, dict):
-                await websocket.send_json(
-                    {"type": "error", "detail": "Invalid payload"}
-                )
+                connection.enqueue_json({"type": "error", "detail": "Invalid payload"})
                 continue
             if payload.get("type") != "message":
-                await websocket.send_json(
-                    {"type": "error", "detail": "Unsupported message type"}
-                )
+                connection.enqueue_json({"type": "error", "detail": "Unsupported message type"})
                 continue
 
             # Coerce friend id from JSON payload.
@@ -64,41 +80,37 @@ async def messages_socket(websocket: WebSocket):
             ciphertext = ciphertext.strip()
             iv = iv.strip()
 
-            if not friend_id or friend_id == current_user.id:
-                await websocket.send_json(
-                    {"type": "error", "detail": "Invalid friend id"}
-                )
+            if not friend_id or friend_id == current_user_id:
+                connection.enqueue_json({"type": "error", "detail": "Invalid friend id"})
                 continue
 
             if not ciphertext or not iv:
-                await websocket.send_json(
-                    {"type": "error", "detail": "Encrypted payload required"}
-                )
+                connection.enqueue_json({"type": "error", "detail": "Encrypted payload required"})
                 continue
 
             # Ensure the recipient is an added friend.
-            friend = (db.query(models.Friend).filter(models.Friend.owner_id == current_user.id,models.Friend.friend_id == friend_id,).first())
-            if not friend:
-                await websocket.send_json(
-                    {"type": "error", "detail": "Friend not added"}
+            # Cached set lookup; only a cold cache goes to the database.
+            is_friend = friendship_cache.lookup(current_user_id, friend_id)
+            if is_friend is None:
+                friend_ids = await database.run_db(friendship_cache.load, current_user_id)
+                is_friend = friend_id in friend_ids
+            if not is_friend:
+                connection.enqueue_json({"type": "error", "detail": "Friend not added"})
+                continue
+
+            # Persist the encrypted message (group-committed with concurrent sends).
+            try:
+                stored_message = await message_writer.submit(
+                    current_user_id, friend_id, ciphertext, iv
                 )
+            except Exception:
+                connection.enqueue_json({"type": "error", "detail": "Could not send message"})
                 continue
 
-            # Persist the encrypted message.
-            new_message = models.chatting(
-                sender_id=current_user.id,
-                receiver_id=friend_id,
-                ciphertext=ciphertext,
-                iv=iv,
-            )
-            db.add(new_message)
-            db.commit()
-            db.refresh(new_message)
-
-            # Fan-out the message to sender and receiver if connected.
-            message_payload = _serialize_ws_message_event(new_message)
-            await manager.send_to_users({current_user.id, friend_id}, message_payload)
+            # Fan-out only after the batch is durable.
+            message_payload = _serialize_ws_message_event(stored_message)
+            await manager.send_to_users({current_user_id, friend_id}, message_payload)
     except WebSocketDisconnect:
-        manager.disconnect(current_user.id, websocket)
+        pass
     finally:
-        db.close()
+        manager.disconnect(current_user_id, websocket)
@@ -1,11 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import func, or_
+from sqlalchemy import and_, case, func, or_
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 
 from ..authentication import oauth2, utils
 
+from ..configaration.config import settings
 from ..database_configure import database, models
+from ..database_configure.username_index import username_prefix_index
 
 from ..serialization import _serialize_user_out
 from ..schema import Schemas
@@ -13,6 +15,15 @@ from ..schema import Schemas
 # User-related endpoints.
 router = APIRouter(tags=["Users"])
 
+USER_SEARCH_LIMIT = 20
+# Queries shorter than a trigram cannot use the pg_trgm indexes.
+TRIGRAM_MIN_QUERY_LENGTH = 3
+
+
+def _escape_like(value: str) -> str:
+    # Treat user input literally inside LIKE/ILIKE patterns.
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
 
 @router.post("/signup", response_model=Schemas.UserOut, status_code=status.HTTP_201_CREATED)
 def register(user: Schemas.UserCreate, db: Session = Depends(database.get_db)):
@@ -62,6 +73,50 @@ def register(user: Schemas.UserCreate, db: Session = Depends(database.get_db)):
     db.refresh(new_user)
     return _serialize_user_out(new_user)
 
+def _relationship_statuses(db: Session, current_user_id: int, user_ids: list[int]) -> dict[int, str]:
+    # Relationship of the current user to each of `user_ids`, in one query
+    # restricted to those ids (friend/request pairs are unique, so one row each).
+    if not user_ids:
+        return {}
+    outgoing = aliased(models.FriendRequest)
+    incoming = aliased(models.FriendRequest)
+    relationship_status = case(
+        (models.Friend.id.isnot(None), "friend"),
+        (outgoing.id.isnot(None), "outgoing_request"),
+        (incoming.id.isnot(None), "incoming_request"),
+        else_="none",
+    )
+    rows = (
+        db.query(models.User.id, relationship_status)
+        .outerjoin(
+            models.Friend,
+            and_(
+                models.Friend.owner_id == current_user_id,
+                models.Friend.friend_id == models.User.id,
+            ),
+        )
+        .outerjoin(
+            outgoing,
+            and_(
+                outgoing.sender_id == current_user_id,
+                outgoing.receiver_id == models.User.id,
+                outgoing.status == "pending",
+            ),
+        )
+        .outerjoin(
+            incoming,
+            and_(
+                incoming.sender_id == models.User.id,
+                incoming.receiver_id == current_user_id,
+                incoming.status == "pending",
+            ),
+        )
+        .filter(models.User.id.in_(user_ids))
+        .all()
+    )
+    return {user_id: status_value for user_id, status_value in rows}
+
+
 # route for searching users by name, username or email
 @router.get("/users/search", response_model=list[Schemas.UserSearchOut])
 def search_users(
@@ -73,63 +128,56 @@ def search_users(
     if len(query) < 2:
         return []
 
-    pattern = f"%{query}%"
-    users = (
-        db.query(models.User)
-        .filter(
-            models.User.id != current_user.id,
-            or_(
-                models.User.name.ilike(pattern),
-                models.User.username.ilike(pattern),
-                models.User.email.ilike(pattern),
+    user_ids = None
+    if settings.user_search_prefix_index and len(query) < TRIGRAM_MIN_QUERY_LENGTH:
+        # Very short queries: username-prefix matches from the in-process
+        # index, once it has been built (the database query is used until then).
+        user_ids = username_prefix_index.lookup(query, USER_SEARCH_LIMIT, exclude_id=current_user.id)
+    if user_ids is not None:
+        users_by_id = {
+            user.id: user
+            for user in db.query(models.User).filter(models.User.id.in_(user_ids)).all()
+        }
+        users = [users_by_id[user_id] for user_id in user_ids if user_id in users_by_id]
+    else:
+        # Substring match served by the pg_trgm GIN indexes; exact and prefix
+        # username matches rank first, then name/email prefixes, then the rest.
+        escaped = _escape_like(query)
+        pattern = f"%{escaped}%"
+        prefix = f"{escaped}%"
+        rank = case(
+            (func.lower(models.User.username) == query.lower(), 0),
+            (models.User.username.ilike(prefix, escape="\\"), 1),
+            (
+                or_(
+                    models.User.name.ilike(prefix, escape="\\"),
+                    models.User.email.ilike(prefix, escape="\\"),
+                ),
+                2,
             ),
+            else_=3,
         )
-        .order_by(models.User.username.asc())
-        .limit(20)
-        .all()
-    )
-
-    friend_ids = {
-        item.friend_id
-        for item in (
-            db.query(models.Friend.friend_id)
-            .filter(models.Friend.owner_id == current_user.id)
-            .all()
-        )
-    }
-    outgoing_request_ids = {
-        item.receiver_id
-        for item in (
-            db.query(models.FriendRequest.receiver_id)
-            .filter(
-                models.FriendRequest.sender_id == current_user.id,
-                models.FriendRequest.status == "pending",
-            )
-            .all()
-        )
-    }
-    incoming_request_ids = {
-        item.sender_id
-        for item in (
-            db.query(models.FriendRequest.sender_id)
+        users = (
+            db.query(models.User)
             .filter(
-                models.FriendRequest.receiver_id == current_user.id,
-                models.FriendRequest.status == "pending",
+                models.User.id != current_user.id,
+                or_(
+                    models.User.name.ilike(pattern, escape="\\"),
+                    models.User.username.ilike(pattern, escape="\\"),
+                    models.User.email.ilike(pattern, escape="\\"),
+                ),
             )
+            .order_by(rank, func.length(models.User.username), models.User.username.asc())
+            .limit(USER_SEARCH_LIMIT)
             .all()
         )
-    }
+
+    statuses = _relationship_statuses(db, current_user.id, [user.id for user in users])
 
     # Build the response with the relationship status for each found user.
     result: list[Schemas.UserSearchOut] = []
     for found_user in users:
-        relationship_status = "none"
-        if found_user.id in friend_ids:
-            relationship_status = "friend"
-        elif found_user.id in outgoing_request_ids:
-            relationship_status = "outgoing_request"
-        elif found_user.id in incoming_request_ids:
-            relationship_status = "incoming_request"
+        relationship_status = statuses.get(found_user.id, "none")
 
         result.append(
             Schemas.UserSearchOut(
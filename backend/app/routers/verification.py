@@ -1,21 +1,18 @@
 from datetime import datetime, timedelta, timezone
-import logging
 import random
-import smtplib
-from email.message import EmailMessage
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from ..authentication import utils
 from ..database_configure import database, models
+from ..database_configure.email_outbox import email_outbox, enqueue_email
+from ..mailer import VERIFICATION_EMAIL
 
 from ..schema import Schemas
-from ..configaration.config import settings
 
 # Verification-related endpoints.
 router = APIRouter(tags=["Verification"])
-logger = logging.getLogger(__name__)
 
 VERIFICATION_CODE_EXPIRE_MINUTES = 10
 
@@ -25,28 +22,6 @@ def generate_verification_code() -> str:
     return f"{random.randint(100000, 999999)}"
 
 
-def send_verification_email(recipient: str, code: str) -> None:
-    # Send a verification email via SMTP using configured settings.
-    if not settings.smtp_host or not settings.smtp_from_email:
-        raise RuntimeError("SMTP is not configured")
-
-    message = EmailMessage()
-    message["Subject"] = "Verify your email"
-    message["From"] = settings.smtp_from_email
-    message["To"] = recipient
-    message.set_content(
-        f"Your verification code is {code}. "
-        f"It expires in {VERIFICATION_CODE_EXPIRE_MINUTES} minutes."
-    )
-
-    with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
-        if settings.smtp_use_tls:
-            server.starttls()
-        if settings.smtp_user and settings.smtp_password:
-            server.login(settings.smtp_user, settings.smtp_password)
-        server.send_message(message)
-
-
 def is_user_verified(db: Session, user_id: int) -> bool:
     # Check whether a user has already verified their email.
     verification = (
@@ -99,20 +74,17 @@ def request_verification(
         )
         db.add(verification)
 
-    try:
-        send_verification_email(user.email, code)
-        db.commit()
-    except Exception:
-        db.rollback()
-        logger.exception(
-            "Could not send verification email to %s via SMTP host %s",
-            user.email,
-            settings.smtp_host,
-        )
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Could not send verification email",
-        )
+    # Code and outbox row commit together; delivery happens off-request.
+    enqueue_email(
+        db,
+        user.email,
+        VERIFICATION_EMAIL,
+        code=code,
+        expire_minutes=VERIFICATION_CODE_EXPIRE_MINUTES,
+        expires_at=expires_at,
+    )
+    db.commit()
+    email_outbox.notify()
 
     return {"message": "Verification code sent"}
 
@@ -68,6 +68,15 @@ class ChatMessageOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ChatMessageChangesOut(BaseModel):
+    # Delta sync result for a conversation since a given time.
+    messages: list[ChatMessageOut]
+    # Messages the current user deleted for themselves (or cleared) since then.
+    removed_message_ids: list[int]
+    # Pass back as `updated_since` on the next sync.
+    synced_at: datetime
+
+
 class ChatThreadOut(BaseModel):
     # Chat list item with last message info.
     friend: FriendOut
@@ -1,8 +1,66 @@
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Any
+
+import orjson
+from sqlalchemy.engine import Row
 
 from .database_configure import models
 
 
+# Compact records for large HTTP list responses. They are built straight from
+# database_configure.chat_queries rows (no ORM instance per row), keep
+# datetimes as values, and are encoded by orjson without an intermediate dict.
+# Field order matches the corresponding response schema, so the JSON is the
+# same as the dict path.
+
+@dataclass(slots=True)
+class ChatMessageRecord:
+    # Schemas.ChatMessageOut, from a chat_queries.MESSAGE_COLUMNS row.
+    id: int
+    sender_id: int
+    receiver_id: int
+    ciphertext: str
+    iv: str
+    crypto_version: int
+    is_deleted_for_everyone: bool
+    edited_at: datetime | None
+    created_at: datetime
+
+
+@dataclass(slots=True)
+class UserSummaryRecord:
+    # Schemas.UserSummary / Schemas.FriendOut, from a USER_SUMMARY_COLUMNS row.
+    id: int
+    username: str
+    name: str | None
+    email: str
+    public_key: str | None
+
+
+@dataclass(slots=True)
+class ChatThreadRecord:
+    # Schemas.ChatThreadOut
+    friend: UserSummaryRecord
+    last_message_id: int | None
+    last_message_ciphertext: str | None
+    last_message_iv: str | None
+    last_message_version: int | None
+    last_message_deleted_for_everyone: bool | None
+    last_time: datetime | None
+
+    @classmethod
+    def from_row(cls, row: Row) -> "ChatThreadRecord":
+        # Row from chat_queries.chat_thread_rows.
+        return cls(UserSummaryRecord(*row[:5]), *row[5:])
+
+
+def _encode_json(value: Any) -> bytes:
+    # Records, dicts and lists straight to JSON bytes, formatting datetimes
+    # like pydantic does (UTC as "Z").
+    return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+
+
 def _serialize_datetime(value: datetime | None) -> str | None:
     if value is None:
         return None
@@ -55,20 +113,6 @@ def _serialize_chat_message(message: models.chatting) -> dict:
     }
 
 
-def _serialize_chat_thread(friend: models.User, last_message: models.chatting | None) -> dict:
-    return {
-        "friend": _serialize_user_summary(friend),
-        "last_message_id": last_message.id if last_message else None,
-        "last_message_ciphertext": last_message.ciphertext if last_message else None,
-        "last_message_iv": last_message.iv if last_message else None,
-        "last_message_version": last_message.crypto_version if last_message else None,
-        "last_message_deleted_for_everyone": (
-            last_message.is_deleted_for_everyone if last_message else None
-        ),
-        "last_time": _serialize_datetime(last_message.created_at if last_message else None),
-    }
-
-
 def _serialize_ws_friend_request_event(event_type: str, friend_request: models.FriendRequest) -> dict:
     return {
         "type": event_type,
@@ -0,0 +1,28 @@
+import time
+
+
+class StartupTimer:
+    # Wall-clock duration of each worker startup phase, reported by /ready.
+    # Imported first by app.main so "imports" covers loading the app modules.
+    def __init__(self) -> None:
+        self._started = time.perf_counter()
+        self._last = self._started
+        self.phases: dict[str, float] = {}
+        self.ready = False
+
+    def mark(self, phase: str) -> None:
+        # Record the time since the previous mark as `phase`.
+        now = time.perf_counter()
+        self.phases[phase] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+    def report(self) -> dict:
+        return {
+            "ready": self.ready,
+            "phases_ms": dict(self.phases),
+            "total_ms": round((self._last - self._started) * 1000, 2),
+        }
+
+
+# Shared per-worker startup timer.
+startup_timer = StartupTimer()
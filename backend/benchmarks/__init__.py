@@ -0,0 +1 @@
+# Standalone benchmark scripts (python -m benchmarks.<name> from backend/).
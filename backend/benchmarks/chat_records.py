@@ -0,0 +1,80 @@
+import argparse
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from app.database_configure.chat_queries import MESSAGE_COLUMNS
+from app.serialization import ChatMessageRecord, _encode_json, _serialize_chat_message
+
+# Memory and throughput of turning message rows into a JSON body (no server
+# or database):
+#   cd backend && python -m benchmarks.chat_records [--messages 5000] [--repeat 20]
+# "dicts" is the old pipeline (one dict per message with isoformat()
+# strings, then json.dumps); "records" builds slotted ChatMessageRecords and
+# encodes them with orjson. Both start from the same Row-like tuples.
+
+MessageRow = namedtuple("MessageRow", [column.key for column in MESSAGE_COLUMNS])
+
+
+def build_rows(count: int) -> list[MessageRow]:
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        MessageRow(
+            index,
+            1 + index % 2,
+            2 - index % 2,
+            "c" * 120,
+            "v" * 16,
+            1,
+            False,
+            None,
+            started + timedelta(seconds=index),
+        )
+        for index in range(1, count + 1)
+    ]
+
+
+def encode_dicts(rows: list[MessageRow]) -> bytes:
+    return json.dumps([_serialize_chat_message(row) for row in rows]).encode()
+
+
+def encode_records(rows: list[MessageRow]) -> bytes:
+    return _encode_json([ChatMessageRecord(*row) for row in rows])
+
+
+def measure(encode, rows: list[MessageRow], repeat: int) -> tuple[float, int]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode(rows)
+        timings.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    encode(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare dict and record serialization of message rows.")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = build_rows(args.messages)
+    print(f"{args.messages} messages, {args.repeat} runs each")
+    for name, encode in (("dicts", encode_dicts), ("records", encode_records)):
+        seconds, peak = measure(encode, rows, args.repeat)
+        print(
+            f"{name:>8}: p50 {seconds * 1000:6.1f} ms | "
+            f"{args.messages / seconds:>9,.0f} messages/s | peak {peak / 1024 / 1024:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
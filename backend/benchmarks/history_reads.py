@@ -0,0 +1,136 @@
+import argparse
+import gc
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+from app.database_configure import chat_queries, models
+from app.serialization import ChatMessageRecord
+
+# Rows/s and peak memory of reading a full conversation history:
+#   cd backend && python -m benchmarks.history_reads [--rows 50000] [--repeat 5]
+# "orm" is the old read (db.query(chatting)...all(), ORM instances in the
+# identity map); "core" is chat_queries.message_rows plus ChatMessageRecords,
+# as the routes do now. Runs on a temporary SQLite file by default (with
+# least/greatest/now defined for it); --database-url points it at a migrated,
+# disposable PostgreSQL database instead, where the rows are rolled back.
+
+SENDER_ID = 1
+RECEIVER_ID = 2
+
+
+def _sqlite_engine(path: Path):
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def add_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function("least", 2, min)
+        dbapi_connection.create_function("greatest", 2, max)
+        dbapi_connection.create_function("now", 0, lambda: datetime.now(timezone.utc).isoformat(" "))
+
+    models.Base.metadata.create_all(engine)
+    return engine
+
+
+def _seed(db: Session, rows: int) -> tuple[int, int]:
+    users = db.execute(
+        insert(models.User).returning(models.User.id),
+        [
+            {"email": f"history{n}@example.com", "password": "x", "username": f"history_bench_{n}"}
+            for n in (1, 2)
+        ],
+    ).scalars().all()
+    sender_id, receiver_id = users
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    db.execute(
+        insert(models.chatting),
+        [
+            {
+                "sender_id": sender_id if n % 2 else receiver_id,
+                "receiver_id": receiver_id if n % 2 else sender_id,
+                "ciphertext": "c" * 120,
+                "iv": "v" * 16,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+            for n in range(rows)
+        ],
+    )
+    db.flush()
+    return sender_id, receiver_id
+
+
+def read_orm(db: Session, user_id: int, friend_id: int) -> int:
+    messages = (
+        db.query(models.chatting)
+        .filter(
+            chat_queries.conversation_filter(user_id, friend_id),
+            chat_queries.visible_for_user_filter(user_id),
+        )
+        .order_by(models.chatting.id.asc())
+        .all()
+    )
+    return len(messages)
+
+
+def read_core(db: Session, user_id: int, friend_id: int) -> int:
+    records = [ChatMessageRecord(*row) for row in chat_queries.message_rows(db, user_id, friend_id)]
+    return len(records)
+
+
+def measure(read, db: Session, user_id: int, friend_id: int, repeat: int) -> tuple[float, int, int]:
+    timings = []
+    count = 0
+    for _ in range(repeat):
+        db.expunge_all()
+        started = time.perf_counter()
+        count = read(db, user_id, friend_id)
+        timings.append(time.perf_counter() - started)
+    db.expunge_all()
+    gc.collect()
+    tracemalloc.start()
+    read(db, user_id, friend_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.expunge_all()
+    return statistics.median(timings), peak, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare ORM and Core reads of a conversation history.")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", help="migrated, disposable PostgreSQL database (default: SQLite)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database_url:
+            engine = create_engine(args.database_url)
+        else:
+            engine = _sqlite_engine(Path(directory) / "history.db")
+        with engine.connect() as connection:
+            transaction = connection.begin()
+            db = Session(bind=connection)
+            try:
+                user_id, friend_id = _seed(db, args.rows)
+                print(f"{args.rows:,} messages on {engine.dialect.name}, {args.repeat} runs each")
+                for name, read in (("orm", read_orm), ("core", read_core)):
+                    seconds, peak, count = measure(read, db, user_id, friend_id, args.repeat)
+                    print(
+                        f"{name:>5}: p50 {seconds * 1000:7.1f} ms | "
+                        f"{count / seconds:>9,.0f} rows/s | peak {peak / 1024 / 1024:.1f} MiB"
+                    )
+            finally:
+                db.close()
+                transaction.rollback()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
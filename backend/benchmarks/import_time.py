@@ -0,0 +1,56 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from app.importtime import profile_imports
+
+# Cost of importing app.main in a fresh interpreter, i.e. what every worker
+# fork and test run pays before the app object exists:
+#   cd backend && python -m benchmarks.import_time [--runs 10] [--top 10]
+# Also counts the database connections opened during the import (expected:
+# none, schema changes go through `python -m app.migrate`).
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - started
+from app.database_configure.database import engine
+pool = engine.pool
+print(json.dumps({"seconds": elapsed, "connections": pool.checkedin() + pool.checkedout()}))
+"""
+
+
+def measure_import() -> dict:
+    result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app.main failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the import time of app.main.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list (0 to skip)")
+    args = parser.parse_args()
+
+    samples = [measure_import() for _ in range(args.runs)]
+    seconds = sorted(sample["seconds"] for sample in samples)
+    connections = max(sample["connections"] for sample in samples)
+    print(
+        f"import app.main over {args.runs} runs: p50 {statistics.median(seconds) * 1000:.1f} ms | "
+        f"min {seconds[0] * 1000:.1f} ms | max {seconds[-1] * 1000:.1f} ms"
+    )
+    print(f"database connections opened during import: {connections}")
+
+    if args.top:
+        entries = profile_imports("app.main")
+        print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for self_us, cumulative_us, name in sorted(entries, key=lambda entry: -entry[1])[: args.top]:
+            print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
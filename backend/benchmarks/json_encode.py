@@ -0,0 +1,109 @@
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI
+
+from app.responses import TrustedJSONResponse
+from app.schema import Schemas
+from app.serialization import ChatMessageRecord
+
+# Response encode time for a long message history, through a throwaway
+# FastAPI app (no server or database):
+#   cd backend && python -m benchmarks.json_encode [--messages 5000] [--repeat 20]
+# "response_model" is the default path (pydantic validates the records and
+# FastAPI encodes them); "trusted" is the FAST_JSON_RESPONSES path
+# (TrustedJSONResponse, orjson). Both bodies are checked to be identical.
+
+
+def build_records(count: int) -> list[ChatMessageRecord]:
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        ChatMessageRecord(
+            index,
+            1 + index % 2,
+            2 - index % 2,
+            "c" * 120,
+            "v" * 16,
+            1,
+            False,
+            started + timedelta(seconds=index, microseconds=5) if index % 10 == 0 else None,
+            started + timedelta(seconds=index),
+        )
+        for index in range(1, count + 1)
+    ]
+
+
+def build_app(records: list[ChatMessageRecord]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/response_model", response_model=list[Schemas.ChatMessageOut])
+    def default():
+        return records
+
+    @app.get("/trusted", response_model=list[Schemas.ChatMessageOut])
+    def trusted():
+        return TrustedJSONResponse(records)
+
+    return app
+
+
+async def get(app: FastAPI, path: str) -> bytes:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 12345),
+        "server": ("benchmark", 80),
+    }
+    body = bytearray()
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.extend(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return bytes(body)
+
+
+async def run(args: argparse.Namespace) -> None:
+    app = build_app(build_records(args.messages))
+    bodies = {}
+    for path in ("response_model", "trusted"):
+        bodies[path] = await get(app, f"/{path}")
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            await get(app, f"/{path}")
+            timings.append(time.perf_counter() - started)
+        print(
+            f"{path:>15}: p50 {statistics.median(timings) * 1000:7.1f} ms | "
+            f"min {min(timings) * 1000:7.1f} ms | {len(bodies[path]) / 1024:.0f} KiB"
+        )
+    print("bodies identical" if bodies["response_model"] == bodies["trusted"] else "BODIES DIFFER")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the default and trusted JSON response paths.")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"GET of {args.messages} messages, {args.repeat} runs each")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from fastapi import HTTPException
+
+from app.authentication import utils
+from app.configaration.config import settings
+
+# Logins per second per core through the dedicated bcrypt pool (the verify
+# step of POST /login), at the configured cost factor:
+#   cd backend && python -m benchmarks.password_hashing [--concurrency 64] [--logins 200]
+# Set PASSWORD_HASH_ROUNDS / PASSWORD_HASH_WORKERS / PASSWORD_HASH_MAX_QUEUE
+# as for the server. Concurrency beyond workers + queue shows the fast 503s.
+
+
+async def run(args: argparse.Namespace, stored_hash: str) -> tuple[list[float], int, float]:
+    latencies: list[float] = []
+    rejected = 0
+    remaining = args.logins
+
+    async def client() -> None:
+        nonlocal rejected, remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                valid, _ = await utils.verify_and_update_password(args.password, stored_hash)
+            except HTTPException:
+                # Fast 503: retry shortly, as a client honouring Retry-After would.
+                rejected += 1
+                remaining += 1
+                await asyncio.sleep(1.0)
+                continue
+            assert valid
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    return latencies, rejected, time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure bcrypt login throughput per core.")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64, help="concurrent login requests")
+    parser.add_argument("--password", default="correct horse battery staple")
+    args = parser.parse_args()
+
+    workers = utils._hash_workers
+    stored_hash = utils.hash_password(args.password)
+    print(
+        f"bcrypt cost {settings.password_hash_rounds}, {workers} hashing workers "
+        f"({os.cpu_count()} CPUs), queue limit {settings.password_hash_max_queue}, "
+        f"concurrency {args.concurrency}"
+    )
+    latencies, rejected, elapsed = asyncio.run(run(args, stored_hash))
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    throughput = len(latencies) / elapsed
+    print(
+        f"{throughput:.1f} logins/s ({throughput / workers:.1f} per core) | "
+        f"p50 {statistics.median(latencies) * 1000:.0f} ms | p99 {p99 * 1000:.0f} ms | "
+        f"503s {rejected}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import time
+
+from app.authentication import oauth2
+from app.rate_limit import InMemoryRateLimiter, RateLimitMiddleware, parse_trusted_proxies
+
+# Per-request overhead of RateLimitMiddleware with the in-memory backend,
+# against the same no-op ASGI app without it (no server, database or Redis):
+#   cd backend && python -m benchmarks.rate_limit [--requests 20000]
+# Cases: a path no rule matches, a per-IP bucket (/login), per-IP plus
+# per-user buckets with a bearer token (/users/search, JWT decode included),
+# a rejected request (429), and /login behind a trusted proxy.
+
+
+async def noop_app(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message) -> None:
+    pass
+
+
+def build_scope(method: str, path: str, headers: list, client: str) -> dict:
+    return {"type": "http", "method": method, "path": path, "headers": headers, "client": (client, 40000)}
+
+
+def bearer(user_id: int) -> list:
+    token = oauth2.create_access_token({"sub": str(user_id)})
+    return [(b"authorization", f"Bearer {token}".encode())]
+
+
+def forwarded_for(value: str) -> list:
+    return [(b"x-forwarded-for", value.encode())]
+
+
+async def per_request(app, scopes: list[dict]) -> float:
+    started = time.perf_counter()
+    for scope in scopes:
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / len(scopes)
+
+
+async def run(args: argparse.Namespace) -> None:
+    count = args.requests
+    # Distinct clients and users so the measured requests are allowed, except "rejected".
+    cases = {
+        "unmatched path": [build_scope("GET", "/chats", [], f"10.1.{n // 250}.{n % 250}") for n in range(count)],
+        "per-ip bucket": [build_scope("POST", "/login", [], f"10.2.{n // 250}.{n % 250}") for n in range(count)],
+        "ip + user (jwt)": [
+            build_scope("GET", "/users/search", bearer(n), f"10.3.{n // 250}.{n % 250}") for n in range(count)
+        ],
+        "rejected (429)": [build_scope("POST", "/login", [], "10.4.0.1") for _ in range(count)],
+        "trusted proxy": [
+            build_scope("POST", "/login", forwarded_for(f"203.0.{n // 250}.{n % 250}, 10.0.0.2"), "10.0.0.1")
+            for n in range(count)
+        ],
+    }
+    baseline = await per_request(noop_app, cases["unmatched path"])
+    print(f"{'no middleware':>16}: {baseline * 1e6:6.2f} us/request")
+    for name, scopes in cases.items():
+        middleware = RateLimitMiddleware(
+            noop_app,
+            backend=InMemoryRateLimiter(max_keys=count * 2),
+            trusted_proxies=parse_trusted_proxies("10.0.0.0/24"),
+        )
+        elapsed = await per_request(middleware, scopes)
+        print(f"{name:>16}: {elapsed * 1e6:6.2f} us/request (+{(elapsed - baseline) * 1e6:.2f})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the rate limit middleware's per-request overhead.")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import statistics
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import event, text
+
+from app.configaration.config import settings
+from app.database_configure import database
+from app.database_configure.username_index import UsernamePrefixIndex
+from app.routers import user
+
+# GET /users/search over a synthetic user table (1M users by default):
+#   cd backend && python -m benchmarks.user_search [--users 1000000] [--keep]
+# Needs a migrated, disposable PostgreSQL database in DATABASE_URL. Users are
+# generated into a separate schema with the same indexes as public.users
+# (copied from the live definitions), and every app connection gets that
+# schema first on its search_path, so the real route code runs unchanged.
+# Compares the indexed plan with a forced sequential scan (how search ran
+# before the trigram indexes) and, for 2-char queries, the prefix index.
+
+SCHEMA = "bench_user_search"
+FIRST_NAMES = [
+    "Alice", "Bob", "Carol", "David", "Emma", "Farah", "George", "Hana", "Ivan", "Julia",
+    "Kenji", "Laura", "Mateo", "Nadia", "Oliver", "Priya", "Quinn", "Rosa", "Samuel", "Tara",
+]
+LAST_NAMES = [
+    "Anderson", "Brown", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Hughes", "Ibrahim", "Jones",
+    "Kim", "Lopez", "Miller", "Nguyen", "Okafor", "Patel", "Rossi", "Smith", "Tanaka", "Walker",
+]
+QUERIES = ["alice", "smith", "garcia12", "ivanhughes4242", "example", "zzqx"]
+SHORT_QUERIES = ["al", "sm", "qu", "zz"]
+
+
+def _seed(users: int) -> None:
+    with database.engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT to_regclass(:name)"), {"name": f"{SCHEMA}.users"}
+        ).scalar()
+        if exists and connection.execute(text(f"SELECT count(*) FROM {SCHEMA}.users")).scalar() == users:
+            print(f"reusing {SCHEMA}.users ({users:,} rows)")
+            return
+        started = time.perf_counter()
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        connection.execute(text(f"CREATE TABLE {SCHEMA}.users (LIKE public.users INCLUDING DEFAULTS)"))
+        connection.execute(
+            text(
+                f"""
+                INSERT INTO {SCHEMA}.users (id, name, email, password, username)
+                SELECT g, first || ' ' || last,
+                       lower(first) || '.' || lower(last) || g || '@example.com',
+                       'x', lower(first) || lower(last) || g
+                FROM generate_series(1, CAST(:users AS bigint)) AS g,
+                LATERAL (
+                    SELECT (CAST(:first_names AS text[]))[1 + (g * 7919) % :first_count] AS first,
+                           (CAST(:last_names AS text[]))[1 + (g * 104729) % :last_count] AS last
+                ) AS names
+                """
+            ),
+            {
+                "users": users,
+                "first_names": FIRST_NAMES,
+                "first_count": len(FIRST_NAMES),
+                "last_names": LAST_NAMES,
+                "last_count": len(LAST_NAMES),
+            },
+        )
+        # Same indexes as the migrated table, built after the bulk load.
+        definitions = connection.execute(
+            text("SELECT indexdef FROM pg_indexes WHERE schemaname = 'public' AND tablename = 'users'")
+        ).scalars()
+        for definition in definitions:
+            connection.execute(text(definition.replace(" ON public.users ", f" ON {SCHEMA}.users ")))
+        connection.execute(text(f"ANALYZE {SCHEMA}.users"))
+        print(f"seeded {users:,} users in {time.perf_counter() - started:.1f}s")
+
+
+def _use_bench_schema() -> None:
+    @event.listens_for(database.engine, "connect")
+    def set_search_path(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET search_path TO {SCHEMA}, public")
+        cursor.close()
+        dbapi_connection.commit()
+
+    database.engine.dispose()
+
+
+def _time_searches(queries: list[str], repeat: int, force_seq_scan: bool = False) -> list[float]:
+    current_user = SimpleNamespace(id=0)
+    latencies: list[float] = []
+    db = database.SessionLocal()
+    try:
+        if force_seq_scan:
+            db.execute(text("SET LOCAL enable_indexscan = off"))
+            db.execute(text("SET LOCAL enable_bitmapscan = off"))
+        for _ in range(repeat):
+            for query in queries:
+                started = time.perf_counter()
+                user.search_users(q=query, db=db, current_user=current_user)
+                latencies.append(time.perf_counter() - started)
+    finally:
+        db.rollback()
+        db.close()
+    return latencies
+
+
+def report(name: str, latencies: list[float]) -> None:
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:>28}: p50 {statistics.median(latencies) * 1000:8.1f} ms | p99 {p99 * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark user search over a synthetic user table.")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each query")
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCHEMA} schema for the next run")
+    args = parser.parse_args()
+
+    _seed(args.users)
+    _use_bench_schema()
+    try:
+        report("substring, indexed", _time_searches(QUERIES, args.repeat))
+        report("substring, seq scan", _time_searches(QUERIES, 1, force_seq_scan=True))
+        report("2-char, database", _time_searches(SHORT_QUERIES, args.repeat))
+
+        index = UsernamePrefixIndex(refresh_seconds=3600)
+        started = time.perf_counter()
+        index.rebuild()
+        print(f"prefix index built in {time.perf_counter() - started:.2f}s")
+        user.username_prefix_index = index
+        settings.user_search_prefix_index = True
+        report("2-char, prefix index", _time_searches(SHORT_QUERIES, args.repeat))
+    finally:
+        if not args.keep:
+            with database.engine.begin() as connection:
+                connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import anyio
+from sqlalchemy import delete
+
+from app.configaration.config import settings
+from app.database_configure import database, models
+from app.database_configure.message_writer import message_writer
+
+# Messages/s, p99 latency and event-loop stalls of the /ws/messages insert
+# path, with the DB work run inline on the event loop ("blocking", as the
+# handler did before) versus offloaded to worker threads ("offloaded").
+#   cd backend && python -m benchmarks.ws_db_offload [--clients 50] [--interval-ms 50]
+# By default each DB call is modelled as a blocking `--db-ms` round trip, so
+# no database is needed. With --real-db SENDER_ID RECEIVER_ID, messages are
+# really stored between two existing users (through the shared group-commit
+# writer when offloaded) and deleted again afterwards.
+
+
+def _insert_one(db, sender_id: int, receiver_id: int) -> int:
+    # The handler's old per-message path: add, commit, refresh.
+    message = models.chatting(sender_id=sender_id, receiver_id=receiver_id, ciphertext="x" * 200, iv="y" * 16)
+    db.add(message)
+    db.commit()
+    db.refresh(message)
+    return message.id
+
+
+class Run:
+    def __init__(self, args: argparse.Namespace, offloaded: bool) -> None:
+        self.args = args
+        self.offloaded = offloaded
+        self.latencies: list[float] = []
+        self.loop_lag: list[float] = []
+        self.stored_ids: list[int] = []
+        self._limiter = anyio.CapacityLimiter(settings.db_pool_size + settings.db_max_overflow)
+
+    async def store(self) -> None:
+        args = self.args
+        if args.real_db is None:
+            if self.offloaded:
+                await anyio.to_thread.run_sync(time.sleep, args.db_ms / 1000, limiter=self._limiter)
+            else:
+                time.sleep(args.db_ms / 1000)
+            return
+        sender_id, receiver_id = args.real_db
+        if self.offloaded:
+            row = await message_writer.submit(sender_id, receiver_id, "x" * 200, "y" * 16)
+            self.stored_ids.append(row.id)
+            return
+        db = database.SessionLocal()
+        try:
+            self.stored_ids.append(_insert_one(db, sender_id, receiver_id))
+        finally:
+            db.close()
+
+    async def client(self, started: float) -> None:
+        # Frames arrive every `--interval-ms`; latency runs from arrival to
+        # stored, so time spent waiting for a blocked loop counts too.
+        interval = self.args.interval_ms / 1000
+        for index in range(self.args.messages):
+            arrival = started + index * interval
+            await asyncio.sleep(max(0.0, arrival - time.perf_counter()))
+            await self.store()
+            self.latencies.append(time.perf_counter() - arrival)
+
+    async def ticker(self, done: asyncio.Event) -> None:
+        # How late a 1 ms timer fires: the delay every other socket sees.
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            self.loop_lag.append(time.perf_counter() - started - 0.001)
+
+    async def run(self) -> float:
+        done = asyncio.Event()
+        ticker = asyncio.create_task(self.ticker(done))
+        started = time.perf_counter()
+        await asyncio.gather(*(self.client(started) for _ in range(self.args.clients)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ticker
+        if self.offloaded:
+            await message_writer.stop()
+        if self.stored_ids:
+            await database.run_db(_delete_messages, self.stored_ids)
+        return elapsed
+
+
+def _delete_messages(db, ids: list[int]) -> None:
+    db.execute(delete(models.chatting).where(models.chatting.id.in_(ids)))
+    db.commit()
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare inline and offloaded DB work in the WebSocket loop.")
+    parser.add_argument("--clients", type=int, default=50, help="concurrent sockets")
+    parser.add_argument("--messages", type=int, default=20, help="messages per socket")
+    parser.add_argument("--interval-ms", type=float, default=50.0, help="gap between a socket's messages")
+    parser.add_argument("--db-ms", type=float, default=2.0, help="modelled DB round trip")
+    parser.add_argument(
+        "--real-db", type=int, nargs=2, metavar=("SENDER_ID", "RECEIVER_ID"), help="store real messages"
+    )
+    args = parser.parse_args()
+
+    source = "real database" if args.real_db else f"modelled {args.db_ms} ms DB calls"
+    print(f"{args.clients} sockets x {args.messages} messages, {source}")
+    for name, offloaded in (("blocking", False), ("offloaded", True)):
+        run = Run(args, offloaded)
+        elapsed = asyncio.run(run.run())
+        total = len(run.latencies)
+        print(
+            f"{name:>10}: {total / elapsed:,.0f} msg/s | "
+            f"p50 {statistics.median(run.latencies) * 1000:.1f} ms | "
+            f"p99 {_percentile(run.latencies, 0.99) * 1000:.1f} ms | "
+            f"loop lag p99 {_percentile(run.loop_lag, 0.99) * 1000:.1f} ms, "
+            f"max {max(run.loop_lag, default=0.0) * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.Websocket_configure.manager import ConnectionManager
+
+# WebSocket fan-out latency with N healthy sockets and one stalled one:
+#   cd backend && python -m benchmarks.ws_fanout [--sockets 1000] [--events 20]
+# Runs in-process against fake sockets (no server or database). "sequential"
+# awaits each socket in turn, as fan-out did before per-connection writers;
+# "manager" goes through ConnectionManager with its send timeout.
+
+
+class FakeSocket:
+    def __init__(self, send_delay: float, stall: float = 0.0) -> None:
+        self._send_delay = send_delay
+        self._stall = stall
+        self.received: list[float] = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, message: str) -> None:
+        if self._stall:
+            await asyncio.sleep(self._stall)
+        elif self._send_delay:
+            await asyncio.sleep(self._send_delay)
+        self.received.append(time.perf_counter())
+
+    async def close(self, code: int | None = None) -> None:
+        pass
+
+
+def _latencies(sockets: list[FakeSocket], sent_at: list[float]) -> list[float]:
+    return [
+        received - sent
+        for socket in sockets
+        for received, sent in zip(socket.received, sent_at)
+    ]
+
+
+async def run_sequential(args: argparse.Namespace) -> tuple[list[float], float, str]:
+    stalled = FakeSocket(0.0, stall=args.stall_seconds)
+    healthy = [FakeSocket(args.send_delay_ms / 1000) for _ in range(args.sockets)]
+    sent_at: list[float] = []
+    started = time.perf_counter()
+    for index in range(args.events):
+        payload = {"type": "new_message", "message": {"id": index, "ciphertext": "x" * 200}}
+        sent_at.append(time.perf_counter())
+        for socket in [stalled, *healthy]:
+            await socket.send_text(json.dumps(payload))
+    return _latencies(healthy, sent_at), time.perf_counter() - started, ""
+
+
+async def run_manager(args: argparse.Namespace) -> tuple[list[float], float, str]:
+    manager = ConnectionManager(send_timeout=args.send_timeout)
+    await manager.start()
+    stalled = FakeSocket(0.0, stall=args.stall_seconds)
+    healthy = [FakeSocket(args.send_delay_ms / 1000) for _ in range(args.sockets)]
+    await manager.connect(0, stalled)
+    for index, socket in enumerate(healthy, start=1):
+        await manager.connect(index, socket)
+    user_ids = set(range(args.sockets + 1))
+    sent_at: list[float] = []
+    started = time.perf_counter()
+    for index in range(args.events):
+        payload = {"type": "new_message", "message": {"id": index, "ciphertext": "x" * 200}}
+        sent_at.append(time.perf_counter())
+        await manager.send_to_users(user_ids, payload)
+        await asyncio.sleep(args.interval_ms / 1000)
+    while any(len(socket.received) < args.events for socket in healthy):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+    # Give the stalled socket's writer time to hit its send timeout.
+    await asyncio.sleep(args.send_timeout)
+    evicted = manager.metrics()["evicted_connections"]
+    await manager.stop()
+    return _latencies(healthy, sent_at), elapsed, f" | evicted {evicted}"
+
+
+def report(name: str, latencies: list[float], elapsed: float, extra: str) -> None:
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{name:>10}: {len(latencies)} deliveries in {elapsed:.2f}s | "
+        f"p50 {statistics.median(latencies) * 1000:.1f} ms | "
+        f"p99 {p99 * 1000:.1f} ms | max {latencies[-1] * 1000:.1f} ms{extra}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure WebSocket fan-out latency with one stalled socket.")
+    parser.add_argument("--sockets", type=int, default=1000, help="healthy sockets")
+    parser.add_argument("--events", type=int, default=20)
+    parser.add_argument("--interval-ms", type=float, default=10.0, help="gap between events")
+    parser.add_argument("--send-delay-ms", type=float, default=0.0, help="per-send time of healthy sockets")
+    parser.add_argument("--stall-seconds", type=float, default=0.5, help="per-send time of the stalled socket")
+    parser.add_argument("--send-timeout", type=float, default=0.2, help="manager eviction timeout")
+    parser.add_argument("--mode", choices=("both", "sequential", "manager"), default="both")
+    args = parser.parse_args()
+
+    print(f"{args.sockets} healthy sockets + 1 stalled ({args.stall_seconds}s per send), {args.events} events")
+    if args.mode in ("both", "sequential"):
+        report("sequential", *asyncio.run(run_sequential(args)))
+    if args.mode in ("both", "manager"):
+        report("manager", *asyncio.run(run_manager(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database_configure import models
+from app.database_configure.database import DATABASE_URL, engine
+
+# Alembic config object (values from alembic.ini).
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# ORM metadata used for `alembic revision --autogenerate`.
+target_metadata = models.Base.metadata
+
+
+def run_migrations_offline() -> None:
+    # Emit SQL to stdout instead of running it (`alembic upgrade head --sql`).
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # Reuse the app engine so SSL and pool settings match the running service.
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
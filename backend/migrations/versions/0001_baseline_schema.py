@@ -0,0 +1,117 @@
+"""Baseline schema
+
+Creates the original tables on an empty database. On databases that were
+bootstrapped by `Base.metadata.create_all` (older dev/prod setups) existing
+tables are left alone and only the chat columns that used to be backfilled
+at startup are added, so `alembic upgrade head` works for both.
+
+Revision ID: 0001_baseline_schema
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline_schema"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer, primary_key=True, nullable=False),
+            sa.Column("name", sa.String, nullable=True),
+            sa.Column("email", sa.String, nullable=False, unique=True),
+            sa.Column("password", sa.String, nullable=False),
+            sa.Column("username", sa.String, nullable=False, unique=True),
+            sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+            sa.Column("public_key", sa.String, nullable=True),
+            sa.Column("encrypted_private_key", sa.String, nullable=True),
+            sa.Column("key_salt", sa.String, nullable=True),
+            sa.Column("key_iv", sa.String, nullable=True),
+            sa.Column("key_version", sa.Integer, nullable=False, server_default=sa.text("1")),
+        )
+
+    if "verified_users" not in existing:
+        op.create_table(
+            "verified_users",
+            sa.Column("id", sa.Integer, primary_key=True, nullable=False),
+            sa.Column("owner_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True),
+            sa.Column("is_verified", sa.Boolean, nullable=True),
+            sa.Column("code", sa.String, nullable=True),
+            sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=True),
+            sa.Column("verified_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        )
+
+    if "password_resets" not in existing:
+        op.create_table(
+            "password_resets",
+            sa.Column("id", sa.Integer, primary_key=True, nullable=False),
+            sa.Column("owner_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, unique=True),
+            sa.Column("code", sa.String, nullable=True),
+            sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=True),
+            sa.Column("used_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        )
+
+    if "chatting" not in existing:
+        op.create_table(
+            "chatting",
+            sa.Column("id", sa.Integer, primary_key=True, nullable=False),
+            sa.Column("sender_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("receiver_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("ciphertext", sa.String, nullable=False),
+            sa.Column("iv", sa.String, nullable=False),
+            sa.Column("crypto_version", sa.Integer, nullable=False, server_default=sa.text("1")),
+            sa.Column("is_deleted_for_everyone", sa.Boolean, nullable=False, server_default=sa.text("false")),
+            sa.Column("deleted_for_sender", sa.Boolean, nullable=False, server_default=sa.text("false")),
+            sa.Column("deleted_for_receiver", sa.Boolean, nullable=False, server_default=sa.text("false")),
+            sa.Column("edited_at", sa.TIMESTAMP(timezone=True), nullable=True),
+            sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+        )
+    else:
+        # Columns previously backfilled by main.ensure_chatting_columns().
+        op.execute("ALTER TABLE chatting ADD COLUMN IF NOT EXISTS is_deleted_for_everyone BOOLEAN NOT NULL DEFAULT FALSE")
+        op.execute("ALTER TABLE chatting ADD COLUMN IF NOT EXISTS deleted_for_sender BOOLEAN NOT NULL DEFAULT FALSE")
+        op.execute("ALTER TABLE chatting ADD COLUMN IF NOT EXISTS deleted_for_receiver BOOLEAN NOT NULL DEFAULT FALSE")
+        op.execute("ALTER TABLE chatting ADD COLUMN IF NOT EXISTS edited_at TIMESTAMPTZ")
+
+    if "friends" not in existing:
+        op.create_table(
+            "friends",
+            sa.Column("id", sa.Integer, primary_key=True, nullable=False),
+            sa.Column("owner_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("friend_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+            sa.UniqueConstraint("owner_id", "friend_id", name="uq_friend_owner_friend"),
+        )
+
+    if "friend_requests" not in existing:
+        op.create_table(
+            "friend_requests",
+            sa.Column("id", sa.Integer, primary_key=True, nullable=False),
+            sa.Column("sender_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("receiver_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("status", sa.String, nullable=False, server_default=sa.text("'pending'")),
+            sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+            sa.Column("responded_at", sa.TIMESTAMP(timezone=True), nullable=True),
+            sa.UniqueConstraint("sender_id", "receiver_id", name="uq_friend_request_sender_receiver"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("friend_requests")
+    op.drop_table("friends")
+    op.drop_table("chatting")
+    op.drop_table("password_resets")
+    op.drop_table("verified_users")
+    op.drop_table("users")
@@ -0,0 +1,79 @@
+"""Chat sync column and hot-query indexes
+
+Adds `chatting.updated_at` (delta sync) and the indexes behind the chat,
+friend and friend-request hot paths. Indexes are built CONCURRENTLY so the
+migration can run against a live database without blocking writes.
+
+Revision ID: 0002_hot_query_indexes
+Revises: 0001_baseline_schema
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_hot_query_indexes"
+down_revision: Union[str, Sequence[str], None] = "0001_baseline_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, definition) - keep in sync with __table_args__ in models.py.
+INDEXES = [
+    # Conversation history / keyset pagination and latest message per thread.
+    (
+        "ix_chatting_conversation_id",
+        "chatting",
+        "(least(sender_id, receiver_id), greatest(sender_id, receiver_id), id)",
+    ),
+    # Delta sync by updated_at within a conversation.
+    (
+        "ix_chatting_conversation_updated_at",
+        "chatting",
+        "(least(sender_id, receiver_id), greatest(sender_id, receiver_id), updated_at)",
+    ),
+    # Rows still visible to their sender / receiver (skip "deleted for me" rows).
+    (
+        "ix_chatting_sender_visible",
+        "chatting",
+        "(sender_id, receiver_id, id) WHERE deleted_for_sender IS false",
+    ),
+    (
+        "ix_chatting_receiver_visible",
+        "chatting",
+        "(receiver_id, sender_id, id) WHERE deleted_for_receiver IS false",
+    ),
+    # Reverse friendship lookups and FK cascades from users.
+    ("ix_friends_friend_id", "friends", "(friend_id)"),
+    # Pending incoming / outgoing request lists, newest first.
+    (
+        "ix_friend_requests_receiver_pending",
+        "friend_requests",
+        "(receiver_id, created_at) WHERE status = 'pending'",
+    ),
+    (
+        "ix_friend_requests_sender_pending",
+        "friend_requests",
+        "(sender_id, created_at) WHERE status = 'pending'",
+    ),
+]
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE chatting ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()"
+    )
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, table, definition in INDEXES:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    op.execute("ALTER TABLE chatting DROP COLUMN IF EXISTS updated_at")
@@ -0,0 +1,44 @@
+"""Trigram indexes for user search
+
+Enables pg_trgm and adds GIN trigram indexes on users.username, name and
+email so `GET /users/search` substring matches stop scanning the table.
+
+Revision ID: 0003_user_search_trigram
+Revises: 0002_hot_query_indexes
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_user_search_trigram"
+down_revision: Union[str, Sequence[str], None] = "0002_hot_query_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, column) - keep in sync with User.__table_args__ in models.py.
+INDEXES = [
+    ("ix_users_username_trgm", "username"),
+    ("ix_users_name_trgm", "name"),
+    ("ix_users_email_trgm", "email"),
+]
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON users USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,47 @@
+"""Email outbox
+
+Adds the `email_outbox` table that verification and password reset emails
+are queued in; the outbox worker delivers them outside the request.
+
+Revision ID: 0004_email_outbox
+Revises: 0003_user_search_trigram
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_email_outbox"
+down_revision: Union[str, Sequence[str], None] = "0003_user_search_trigram"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.Integer, primary_key=True, nullable=False),
+        sa.Column("recipient", sa.String, nullable=False),
+        sa.Column("subject", sa.String, nullable=False),
+        sa.Column("body", sa.String, nullable=False),
+        sa.Column("status", sa.String, nullable=False, server_default=sa.text("'pending'")),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default=sa.text("0")),
+        sa.Column("next_attempt_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+        sa.Column("last_error", sa.String, nullable=True),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False, server_default=sa.text("now()")),
+    )
+    op.create_index(
+        "ix_email_outbox_pending_due",
+        "email_outbox",
+        ["next_attempt_at", "id"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_email_outbox_pending_due", table_name="email_outbox")
+    op.drop_table("email_outbox")
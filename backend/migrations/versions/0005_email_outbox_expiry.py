@@ -0,0 +1,30 @@
+"""Email outbox expiry
+
+Adds `email_outbox.expires_at`: verification and password reset emails
+carry a code that stops working after a few minutes, so the outbox worker
+stops retrying them at that point and purges the row.
+
+Revision ID: 0005_email_outbox_expiry
+Revises: 0004_email_outbox
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_email_outbox_expiry"
+down_revision: Union[str, Sequence[str], None] = "0004_email_outbox"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("email_outbox", sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("email_outbox", "expires_at")
@@ -0,0 +1,31 @@
+import os
+
+import pytest
+
+# Run from backend/:  python -m pytest tests
+# Settings are read when app modules are imported, so placeholders are filled
+# in for anything the environment does not set. Tests that need a real
+# PostgreSQL database use the `postgres_url` fixture and are skipped unless
+# DATABASE_URL is set (point it at a migrated, disposable database).
+_DATABASE_URL = os.getenv("DATABASE_URL")
+
+for name, value in {
+    "DATABASE_URL": "postgresql://chitchat@localhost/chitchat_test",
+    "SECRET_KEY": "test-secret-key",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "SMTP_HOST": "localhost",
+    "SMTP_PORT": "25",
+    "SMTP_USER": "test",
+    "SMTP_PASSWORD": "test",
+    "SMTP_FROM_EMAIL": "noreply@example.com",
+}.items():
+    if not os.environ.get(name):
+        os.environ[name] = value
+
+
+@pytest.fixture(scope="session")
+def postgres_url() -> str:
+    if not _DATABASE_URL:
+        pytest.skip("DATABASE_URL is not set")
+    return _DATABASE_URL
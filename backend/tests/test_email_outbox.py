@@ -0,0 +1,195 @@
+import asyncio
+import socketserver
+import threading
+from datetime import datetime, timedelta, timezone
+from email import message_from_bytes
+
+import pytest
+from sqlalchemy import delete, func, inspect, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.configaration.config import settings
+from app.database_configure import database, email_outbox, models
+from app.database_configure.email_outbox import EmailOutboxWorker, _claim_batch, _purge, enqueue_email
+from app.mailer import VERIFICATION_EMAIL, Mailer
+
+# Outbox claim, retry and purge on PostgreSQL (the queries rely on now() +
+# interval and SKIP LOCKED), inside a transaction that is rolled back. The
+# worker sends through a local SMTP stand-in; run_db is pointed at the test
+# session so it sees the uncommitted rows.
+
+REJECTED = "nobody@example.com"
+
+
+class SMTPStandIn(socketserver.StreamRequestHandler):
+    # Just enough SMTP for smtplib: no TLS or AUTH, refuses REJECTED.
+    def handle(self) -> None:
+        self._reply("220 stand-in ESMTP")
+        recipients: list[str] = []
+        while line := self.rfile.readline():
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb == "MAIL":
+                recipients = []
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                address = command.split(":", 1)[1].strip().strip("<>")
+                if address == REJECTED:
+                    self._reply("550 no such user")
+                else:
+                    recipients.append(address)
+                    self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 end data with <CRLF>.<CRLF>")
+                data = b"".join(iter(lambda: self.rfile.readline(), b".\r\n"))
+                self.server.received.append((recipients, message_from_bytes(data)))
+                self._reply("250 queued")
+            elif verb == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                # EHLO/HELO, RSET, NOOP.
+                self._reply("250 OK")
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPStandIn)
+    server.daemon_threads = True
+    server.received = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings, "smtp_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "smtp_port", server.server_address[1])
+    monkeypatch.setattr(settings, "smtp_use_tls", False)
+    monkeypatch.setattr(settings, "smtp_user", "")
+    # One pooled session, so emails go out in claim order.
+    test_mailer = Mailer(pool_size=1)
+    monkeypatch.setattr(email_outbox, "mailer", test_mailer)
+    yield server
+    test_mailer.close_idle()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def db(postgres_url, monkeypatch):
+    engine = database.engine
+    if engine.dialect.name != "postgresql":
+        pytest.skip("the email outbox is tested on PostgreSQL only")
+    try:
+        connection = engine.connect()
+    except OperationalError as exc:
+        pytest.skip(f"database unavailable: {exc.orig}")
+    migrated = inspect(connection).has_table("email_outbox")
+    connection.rollback()
+    if not migrated:
+        connection.close()
+        pytest.skip("database is not migrated (python -m app.migrate)")
+    transaction = connection.begin()
+    # The outbox functions commit; here that only releases a savepoint.
+    session = Session(bind=connection, join_transaction_mode="create_savepoint")
+    session.execute(delete(models.EmailOutbox))
+
+    async def run_db(fn, *args):
+        return fn(session, *args)
+
+    monkeypatch.setattr(database, "run_db", run_db)
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+def _rows(db: Session) -> dict[str, models.EmailOutbox]:
+    db.expire_all()
+    return {row.recipient: row for row in db.scalars(select(models.EmailOutbox))}
+
+
+def test_worker_sends_due_rows_and_backs_off_rejected_ones(db, smtp_server):
+    enqueue_email(db, "ada@example.com", VERIFICATION_EMAIL, code="123456", expire_minutes=10)
+    enqueue_email(db, REJECTED, VERIFICATION_EMAIL, code="654321", expire_minutes=10)
+    # Its code has expired: never sent.
+    enqueue_email(
+        db,
+        "late@example.com",
+        VERIFICATION_EMAIL,
+        expires_at=datetime.now(timezone.utc) - timedelta(minutes=1),
+        code="000000",
+        expire_minutes=10,
+    )
+    db.commit()
+    worker = EmailOutboxWorker(retry_base_seconds=10)
+
+    assert asyncio.run(worker._process_batch()) == 2
+
+    [(recipients, message)] = smtp_server.received
+    assert recipients == ["ada@example.com"]
+    assert message["Subject"] == "Verify your email"
+    assert "123456" in message.get_payload()
+    rows = _rows(db)
+    assert set(rows) == {REJECTED, "late@example.com"}
+    rejected = rows[REJECTED]
+    assert (rejected.status, rejected.attempts) == ("pending", 1)
+    assert "550" in rejected.last_error
+    assert rejected.next_attempt_at == db.scalar(select(func.now() + timedelta(seconds=10)))
+    assert worker.stats() == {"sent": 1, "failed": 1, "purged": 0}
+    # The retry is not due yet.
+    assert asyncio.run(worker._process_batch()) == 0
+
+
+def test_rows_are_marked_failed_after_max_attempts(db, smtp_server):
+    db.add(models.EmailOutbox(recipient=REJECTED, subject="s", body="b", attempts=1))
+    db.commit()
+
+    asyncio.run(EmailOutboxWorker(max_attempts=2)._process_batch())
+
+    row = _rows(db)[REJECTED]
+    assert (row.status, row.attempts) == ("failed", 2)
+    assert smtp_server.received == []
+
+
+def test_claim_leases_rows_until_the_lease_runs_out(db):
+    for recipient in ("first@example.com", "second@example.com"):
+        db.add(models.EmailOutbox(recipient=recipient, subject="s", body="b"))
+    db.commit()
+
+    [first] = _claim_batch(db, 1, lease_seconds=120)
+    [second] = _claim_batch(db, 1, lease_seconds=-1)
+    assert (first.recipient, second.recipient) == ("first@example.com", "second@example.com")
+    # The first row is still leased; the second one's lease has run out,
+    # as if its worker had crashed mid-send.
+    assert [row.recipient for row in _claim_batch(db, 10, lease_seconds=120)] == ["second@example.com"]
+    assert _rows(db)["second@example.com"].attempts == 2
+
+
+def test_purge_deletes_expired_and_old_failed_rows(db):
+    now = db.scalar(select(func.now()))
+    db.add_all(
+        [
+            models.EmailOutbox(recipient="expired@example.com", subject="s", body="b", expires_at=now),
+            models.EmailOutbox(
+                recipient="old-failure@example.com",
+                subject="s",
+                body="b",
+                status="failed",
+                created_at=now - timedelta(hours=2),
+            ),
+            models.EmailOutbox(recipient="new-failure@example.com", subject="s", body="b", status="failed"),
+            # Old but still being retried.
+            models.EmailOutbox(
+                recipient="retrying@example.com", subject="s", body="b", created_at=now - timedelta(hours=2)
+            ),
+            models.EmailOutbox(
+                recipient="pending@example.com", subject="s", body="b", expires_at=now + timedelta(minutes=5)
+            ),
+        ]
+    )
+    db.commit()
+
+    assert _purge(db, failed_retention_seconds=3600) == 2
+    assert set(_rows(db)) == {"new-failure@example.com", "retrying@example.com", "pending@example.com"}
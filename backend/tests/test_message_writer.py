@@ -0,0 +1,69 @@
+import asyncio
+from datetime import datetime, timezone
+
+import anyio
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database_configure import database, models
+from app.database_configure.message_writer import MessageBatchWriter
+
+# Group commit against a SQLite file standing in for PostgreSQL (with a
+# now() function for the server defaults). run_db keeps its worker threads,
+# so concurrent writes can race as they would in production.
+
+
+@pytest.fixture
+def sqlite_run_db(monkeypatch, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}", connect_args={"timeout": 30})
+
+    @event.listens_for(engine, "connect")
+    def add_now(dbapi_connection, connection_record):
+        dbapi_connection.create_function("now", 0, lambda: datetime.now(timezone.utc).isoformat(" "))
+
+    models.Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine)
+
+    async def run_db(fn, *args):
+        def call():
+            db = session_factory()
+            try:
+                return fn(db, *args)
+            finally:
+                db.close()
+
+        return await anyio.to_thread.run_sync(call)
+
+    monkeypatch.setattr(database, "run_db", run_db)
+    yield
+    engine.dispose()
+
+
+def test_batch_is_stored_in_submission_order(sqlite_run_db):
+    async def scenario():
+        writer = MessageBatchWriter(window_seconds=0.01)
+        rows = await asyncio.gather(*(writer.submit(1, 2, f"c{i}", "iv") for i in range(5)))
+        await writer.stop()
+        return rows
+
+    rows = asyncio.run(scenario())
+    assert [row.ciphertext for row in rows] == ["c0", "c1", "c2", "c3", "c4"]
+    assert [row.id for row in rows] == sorted(row.id for row in rows)
+
+
+def test_bad_row_fails_alone_and_keeps_the_order(sqlite_run_db):
+    async def scenario():
+        writer = MessageBatchWriter(window_seconds=0.01)
+        submits = [writer.submit(1, 2, f"c{i}", "iv") for i in range(5)]
+        # NULL ciphertext violates NOT NULL, failing the batch insert.
+        submits.insert(2, writer.submit(1, 2, None, "iv"))
+        results = await asyncio.gather(*submits, return_exceptions=True)
+        await writer.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert isinstance(results[2], RuntimeError)
+    stored = [row for row in results if not isinstance(row, Exception)]
+    assert [row.ciphertext for row in stored] == ["c0", "c1", "c2", "c3", "c4"]
+    assert [row.id for row in stored] == sorted(row.id for row in stored)
@@ -0,0 +1,162 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.database_configure import chat_queries, database
+from app.database_configure.friendship_cache import FriendshipCache
+from app.routers import friend_request, user
+
+# EXPLAIN-based regression test for the hot queries: each one must be served
+# by an index, never a sequential scan. The queries are the real ones (run
+# through the same functions the routes use) against a migrated PostgreSQL
+# database; they are recorded as executed and then EXPLAINed with
+# enable_seqscan off, so a seq scan in the plan means no index can serve
+# the query. Needs no data; everything runs in a rolled-back transaction.
+# Queries whose best plan depends on table size get SEEDS first: rows and
+# statistics in a temporary table, so the planner sees a realistic one.
+
+USER_ID = 1
+FRIEND_ID = 2
+SINCE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+# name -> (function(db), indexes the plan must use)
+HOT_QUERIES = {
+    "friend_list": (lambda db: chat_queries.friend_rows(db, USER_ID), ()),
+    "chat_list": (
+        lambda db: chat_queries.chat_thread_rows(db, USER_ID),
+        ("ix_chatting_sender_visible", "ix_chatting_receiver_visible"),
+    ),
+    "history_latest_page": (
+        lambda db: list(chat_queries.message_rows(db, USER_ID, FRIEND_ID, limit=50)),
+        ("ix_chatting_conversation_id",),
+    ),
+    "history_before": (
+        lambda db: list(chat_queries.message_rows(db, USER_ID, FRIEND_ID, before_id=1000, limit=50)),
+        ("ix_chatting_conversation_id",),
+    ),
+    "history_after": (
+        lambda db: list(chat_queries.message_rows(db, USER_ID, FRIEND_ID, after_id=1000, limit=50)),
+        ("ix_chatting_conversation_id",),
+    ),
+    "history_export": (
+        lambda db: list(chat_queries.message_rows(db, USER_ID, FRIEND_ID)),
+        ("ix_chatting_conversation_id",),
+    ),
+    "history_changes": (
+        lambda db: list(chat_queries.message_change_rows(db, USER_ID, FRIEND_ID, SINCE)),
+        ("ix_chatting_conversation_updated_at",),
+    ),
+    "friendship_check": (lambda db: FriendshipCache().load(db, USER_ID), ()),
+    "friend_requests": (
+        lambda db: friend_request.list_friend_requests(db=db, current_user=SimpleNamespace(id=USER_ID)),
+        ("ix_friend_requests_receiver_pending", "ix_friend_requests_sender_pending"),
+    ),
+    "user_search": (
+        lambda db: user.search_users(q="alice", db=db, current_user=SimpleNamespace(id=USER_ID)),
+        (),
+    ),
+    "relationship_status": (
+        lambda db: user._relationship_statuses(db, USER_ID, [FRIEND_ID, 3]),
+        (),
+    ),
+}
+
+
+def _seed_long_conversation(connection) -> None:
+    # 20k messages last changed well before SINCE, so delta sync has to use
+    # the updated_at index instead of walking the conversation by id. They go
+    # into a temporary copy of chatting (same index names) that shadows the
+    # real table until the rollback drops it, statistics included.
+    connection.exec_driver_sql("CREATE TEMP TABLE chatting (LIKE public.chatting INCLUDING DEFAULTS)")
+    definitions = connection.execute(
+        text("SELECT indexdef FROM pg_indexes WHERE schemaname = 'public' AND tablename = 'chatting'")
+    ).scalars().all()
+    for definition in definitions:
+        connection.exec_driver_sql(definition.replace(" ON public.chatting ", " ON pg_temp.chatting "))
+    connection.execute(
+        text(
+            "INSERT INTO pg_temp.chatting (sender_id, receiver_id, ciphertext, iv, created_at, updated_at) "
+            "SELECT :user_id, :friend_id, 'c', 'v', changed, changed FROM ("
+            "  SELECT CAST(:since AS timestamptz) - n * interval '1 minute' AS changed"
+            "  FROM generate_series(1, 20000) AS n"
+            ") AS history"
+        ),
+        {"user_id": USER_ID, "friend_id": FRIEND_ID, "since": SINCE},
+    )
+    connection.exec_driver_sql("ANALYZE pg_temp.chatting")
+
+
+# name -> function(connection) run before the query is EXPLAINed.
+SEEDS = {
+    "history_changes": _seed_long_conversation,
+}
+
+
+@pytest.fixture(scope="module")
+def connection(postgres_url):
+    engine = database.engine
+    if engine.dialect.name != "postgresql":
+        pytest.skip("query plans are checked on PostgreSQL only")
+    try:
+        connection = engine.connect()
+    except OperationalError as exc:
+        pytest.skip(f"database unavailable: {exc.orig}")
+    migrated = inspect(connection).has_table("chatting")
+    connection.rollback()
+    if not migrated:
+        connection.close()
+        pytest.skip("database is not migrated (python -m app.migrate)")
+    yield connection
+    connection.close()
+
+
+def _plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+
+def _explain(connection, run, seed=None) -> list[dict]:
+    # Plans of every statement `run(db)` executes (after `seed`, if any).
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    transaction = connection.begin()
+    try:
+        if seed is not None:
+            seed(connection)
+        db = Session(bind=connection)
+        event.listen(connection, "before_cursor_execute", record)
+        try:
+            run(db)
+        finally:
+            event.remove(connection, "before_cursor_execute", record)
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plans = []
+        for statement, parameters in statements:
+            result = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plans.append(result.scalar()[0]["Plan"])
+        return plans
+    finally:
+        transaction.rollback()
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_indexes(connection, name):
+    run, required_indexes = HOT_QUERIES[name]
+    plans = _explain(connection, run, SEEDS.get(name))
+    assert plans, f"{name} ran no queries"
+
+    nodes = [node for plan in plans for node in _plan_nodes(plan)]
+    seq_scans = [node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"]
+    assert not seq_scans, f"{name} falls back to a sequential scan of {seq_scans}"
+
+    used_indexes = {node["Index Name"] for node in nodes if "Index Name" in node}
+    missing = set(required_indexes) - used_indexes
+    assert not missing, f"{name} does not use {sorted(missing)} (uses {sorted(used_indexes)})"
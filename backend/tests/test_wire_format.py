@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta, timezone
+
+import anyio
+import pytest
+from fastapi import FastAPI
+
+from app.responses import TrustedJSONResponse
+from app.schema import Schemas
+from app.serialization import ChatMessageRecord, ChatThreadRecord, UserSummaryRecord
+
+# Golden test for FAST_JSON_RESPONSES: the orjson fast path must write the
+# same bytes as FastAPI's default response_model path for the list routes
+# that use it. Both are served by a throwaway app through plain ASGI calls.
+
+UTC = timezone.utc
+IST = timezone(timedelta(hours=5, minutes=30))
+
+MESSAGES = [
+    ChatMessageRecord(
+        1, 10, 20, "cipher+/=", "iv==", 1, False, None,
+        datetime(2026, 3, 1, 12, 30, 5, 123456, tzinfo=UTC),
+    ),
+    ChatMessageRecord(
+        2, 20, 10, "é\"\\\n \U0001f600", "iv", 2, True,
+        datetime(2026, 3, 1, 13, 0, tzinfo=UTC),
+        datetime(2026, 3, 1, 12, 59, 59, tzinfo=IST),
+    ),
+]
+
+THREADS = [
+    ChatThreadRecord(
+        UserSummaryRecord(20, "zoë", "Zoë \"Z\"", "zoe@example.com", "pk=="),
+        2, "cipher", "iv", 1, False, datetime(2026, 3, 1, 12, 0, 0, 1, tzinfo=UTC),
+    ),
+    ChatThreadRecord(
+        UserSummaryRecord(30, "sam", None, "sam@example.com", None),
+        None, None, None, None, None, None,
+    ),
+]
+
+CHANGES = {
+    "messages": MESSAGES,
+    "removed_message_ids": [3, 4],
+    "synced_at": datetime(2026, 3, 2, tzinfo=UTC),
+}
+
+CASES = {
+    "messages": (list[Schemas.ChatMessageOut], MESSAGES),
+    "threads": (list[Schemas.ChatThreadOut], THREADS),
+    "changes": (Schemas.ChatMessageChangesOut, CHANGES),
+    "empty": (list[Schemas.ChatMessageOut], []),
+}
+
+
+def _build_app(response_model, content) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/default", response_model=response_model)
+    def default():
+        return content
+
+    @app.get("/trusted", response_model=response_model)
+    def trusted():
+        return TrustedJSONResponse(content)
+
+    return app
+
+
+def _get(app: FastAPI, path: str) -> tuple[int, bytes]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+    response = {"status": None, "body": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] += message.get("body", b"")
+
+    anyio.run(app, scope, receive, send)
+    return response["status"], response["body"]
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_trusted_json_matches_response_model(name):
+    app = _build_app(*CASES[name])
+    default_status, default_body = _get(app, "/default")
+    trusted_status, trusted_body = _get(app, "/trusted")
+    assert default_status == trusted_status == 200
+    assert trusted_body == default_body
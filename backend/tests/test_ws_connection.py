@@ -0,0 +1,134 @@
+import asyncio
+import json
+
+from app.Websocket_configure.connection import (
+    OVERFLOW_COALESCE,
+    OVERFLOW_DISCONNECT,
+    OVERFLOW_DROP_OLDEST,
+    OutboundConnection,
+)
+
+# OutboundConnection against a fake socket. Frames are queued before start()
+# so the writer sees a full queue; it drains them once started.
+
+
+class FakeSocket:
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+        self.close_code: int | None = None
+
+    async def send_text(self, message: str) -> None:
+        self.sent.append(json.loads(message))
+
+    async def close(self, code: int | None = None) -> None:
+        self.close_code = code
+
+
+def _frame(text: str) -> str:
+    return json.dumps({"text": text})
+
+
+async def _settle() -> None:
+    # Each send goes through wait_for, which takes a few loop iterations.
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+async def _drain(connection: OutboundConnection) -> None:
+    connection.start()
+    await _settle()
+    connection.close()
+
+
+def test_drop_oldest_keeps_the_newest_frames():
+    async def scenario():
+        socket = FakeSocket()
+        connection = OutboundConnection(
+            1, socket, lambda _: None, max_queue=2, overflow_policy=OVERFLOW_DROP_OLDEST
+        )
+        for text in ("a", "b", "c"):
+            assert connection.enqueue(_frame(text))
+        await _drain(connection)
+        return socket.sent, connection.dropped
+
+    sent, dropped = asyncio.run(scenario())
+    assert [frame["text"] for frame in sent] == ["b", "c"]
+    assert dropped == 1
+
+
+def test_coalesce_replaces_the_queued_frame_for_the_same_key():
+    async def scenario():
+        socket = FakeSocket()
+        connection = OutboundConnection(
+            1, socket, lambda _: None, max_queue=2, overflow_policy=OVERFLOW_COALESCE
+        )
+        connection.enqueue(_frame("first read"), coalesce_key="read:7")
+        connection.enqueue(_frame("typing"), coalesce_key="typing:7")
+        connection.enqueue(_frame("second read"), coalesce_key="read:7")
+        # No queued frame shares this key, so the oldest one is dropped.
+        connection.enqueue(_frame("message"))
+        await _drain(connection)
+        return socket.sent, connection.coalesced, connection.dropped
+
+    sent, coalesced, dropped = asyncio.run(scenario())
+    assert [frame["text"] for frame in sent] == ["typing", "message"]
+    assert (coalesced, dropped) == (1, 1)
+
+
+def test_disconnect_policy_evicts_the_slow_consumer():
+    async def scenario():
+        socket = FakeSocket()
+        unregistered = []
+        connection = OutboundConnection(
+            1, socket, unregistered.append, max_queue=1, overflow_policy=OVERFLOW_DISCONNECT
+        )
+        assert connection.enqueue(_frame("a"))
+        assert not connection.enqueue(_frame("b"))
+        await _settle()
+        return socket, connection, unregistered
+
+    socket, connection, unregistered = asyncio.run(scenario())
+    assert connection.closed and connection.evicted
+    assert unregistered == [connection]
+    assert connection.depth == 0
+    assert socket.close_code == 1013
+    assert socket.sent == []
+
+
+def test_batch_window_sends_a_burst_as_one_frame():
+    async def scenario():
+        socket = FakeSocket()
+        connection = OutboundConnection(1, socket, lambda _: None, batch_window=0.01, batch_max_events=3)
+        connection.start()
+        for text in ("a", "b", "c", "d"):
+            connection.enqueue(_frame(text))
+        await asyncio.sleep(0.05)
+        # A lone event after the window is sent as-is.
+        connection.enqueue(_frame("e"))
+        await asyncio.sleep(0.05)
+        connection.close()
+        return socket.sent, connection.batches
+
+    sent, batches = asyncio.run(scenario())
+    assert sent == [
+        {"type": "batch", "events": [{"text": "a"}, {"text": "b"}, {"text": "c"}]},
+        {"text": "d"},
+        {"text": "e"},
+    ]
+    assert batches == 1
+
+
+def test_replay_skips_live_copies_of_replayed_events():
+    async def scenario():
+        socket = FakeSocket()
+        connection = OutboundConnection(1, socket, lambda _: None)
+        # Published while the replay was being read.
+        connection.enqueue('{"seq":3,"text":"c"}', seq=3)
+        connection.enqueue('{"seq":4,"text":"d"}', seq=4)
+        connection.replay(['{"seq":2,"text":"b"}', '{"seq":3,"text":"c"}'], last_seq=3)
+        # A late live copy of a replayed event.
+        connection.enqueue('{"seq":3,"text":"c"}', seq=3)
+        await _drain(connection)
+        return socket.sent
+
+    assert [frame["seq"] for frame in asyncio.run(scenario())] == [2, 3, 4]
@@ -0,0 +1,52 @@
+import asyncio
+
+from app.Websocket_configure.event_log import InMemoryEventLog, _select, with_seq
+
+# Replay window selection and the in-memory log's per-user numbering.
+
+FRAMES = ['{"seq":3}', '{"seq":4}', '{"seq":5}']
+
+
+def test_select_returns_the_frames_after_since():
+    assert _select(5, FRAMES, 2) == FRAMES
+    assert _select(5, FRAMES, 4) == ['{"seq":5}']
+    assert _select(5, FRAMES, 5) == []
+
+
+def test_select_requires_a_resync_outside_the_window():
+    # Frame 2 is no longer retained.
+    assert _select(5, FRAMES, 1) is None
+    # The client is ahead of the log: the sequence was reset.
+    assert _select(5, FRAMES, 6) is None
+    assert _select(0, [], 0) == []
+
+
+def test_with_seq_prefixes_the_encoded_object():
+    assert with_seq('{"type":"message"}', 7) == '{"seq":7,"type":"message"}'
+    assert with_seq("{}", 1) == '{"seq":1}'
+
+
+def test_in_memory_log_numbers_each_user_and_keeps_the_newest_frames():
+    async def scenario():
+        log = InMemoryEventLog(size=2)
+        for text in ("a", "b", "c"):
+            await log.append(1, f'{{"text":"{text}"}}')
+        await log.append(2, '{"text":"x"}')
+        return await log.since(1, 1), await log.since(1, 0), await log.since(2, 0)
+
+    in_window, too_old, other_user = asyncio.run(scenario())
+    assert in_window == (3, ['{"seq":2,"text":"b"}', '{"seq":3,"text":"c"}'])
+    assert too_old == (3, None)
+    assert other_user == (1, ['{"seq":1,"text":"x"}'])
+
+
+def test_evicted_users_keep_their_sequence():
+    async def scenario():
+        log = InMemoryEventLog(size=10, max_users=1)
+        await log.append(1, "{}")
+        await log.append(2, "{}")
+        return await log.since(1, 1), await log.append(1, "{}")
+
+    since, seq = asyncio.run(scenario())
+    assert since == (1, [])
+    assert seq == 2
@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+
+from app.Websocket_configure.event_log import InMemoryEventLog
+from app.Websocket_configure.manager import ConnectionManager
+
+# ConnectionManager with a fake socket and the in-memory pub/sub: replay on
+# reconnect, and what is left registered when connecting fails.
+
+
+class FakeSocket:
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_text(self, message: str) -> None:
+        self.sent.append(json.loads(message))
+
+    async def close(self, code: int | None = None) -> None:
+        pass
+
+
+class UnavailableEventLog(InMemoryEventLog):
+    async def since(self, user_id: int, seq: int):
+        raise ConnectionError("event log unavailable")
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_reconnect_replays_missed_events_once():
+    async def scenario():
+        manager = ConnectionManager(event_log=InMemoryEventLog(size=10))
+        await manager.start()
+        for text in ("a", "b", "c"):
+            await manager.send_to_user(1, {"type": "message", "text": text})
+        socket = FakeSocket()
+        await manager.connect(1, socket, since=1)
+        await manager.send_to_user(1, {"type": "message", "text": "d"})
+        await _settle()
+        await manager.stop()
+        return socket.sent
+
+    sent = asyncio.run(scenario())
+    assert [(event["seq"], event["text"]) for event in sent] == [(2, "b"), (3, "c"), (4, "d")]
+
+
+def test_reconnect_outside_the_log_gets_resync_required():
+    async def scenario():
+        manager = ConnectionManager(event_log=InMemoryEventLog(size=2))
+        await manager.start()
+        for text in ("a", "b", "c", "d"):
+            await manager.send_to_user(1, {"type": "message", "text": text})
+        socket = FakeSocket()
+        await manager.connect(1, socket, since=1)
+        await _settle()
+        await manager.stop()
+        return socket.sent
+
+    assert asyncio.run(scenario()) == [{"type": "resync_required", "seq": 4}]
+
+
+def test_failed_replay_does_not_leave_the_connection_registered():
+    async def scenario():
+        manager = ConnectionManager(event_log=UnavailableEventLog())
+        await manager.start()
+        with pytest.raises(ConnectionError):
+            await manager.connect(1, FakeSocket(), since=3)
+        await manager.send_to_user(1, {"type": "message"})
+        metrics = manager.metrics()
+        await manager.stop()
+        return metrics
+
+    metrics = asyncio.run(scenario())
+    assert metrics["connections"] == 0
+    assert metrics["queued_frames"] == 0
+
+
+def test_dispatch_keeps_its_task_until_delivered():
+    async def scenario():
+        manager = ConnectionManager()
+        await manager.start()
+        socket = FakeSocket()
+        await manager.connect(1, socket)
+        manager.dispatch({1}, {"type": "message"})
+        pending = len(manager._dispatch_tasks)
+        await _settle()
+        await manager.stop()
+        return pending, len(manager._dispatch_tasks), socket.sent
+
+    pending, remaining, sent = asyncio.run(scenario())
+    assert (pending, remaining) == (1, 0)
+    assert sent == [{"type": "message"}]
@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+from app.Websocket_configure import pubsub
+from app.Websocket_configure.pubsub import RedisPubSub
+
+# RedisPubSub with an injected stand-in for the redis.asyncio client: a
+# publish reaches every open subscription, and a subscription can be made to
+# fail the way a dropped Redis connection does.
+
+
+class StubSubscription:
+    def __init__(self, client: "StubClient") -> None:
+        self._client = client
+        self._messages: asyncio.Queue = asyncio.Queue()
+        self.channels: set[str] = set()
+        self.closed = False
+
+    async def subscribe(self, channel: str) -> None:
+        self.channels.add(channel)
+        self._client.subscriptions.append(self)
+
+    async def unsubscribe(self, channel: str) -> None:
+        self.channels.discard(channel)
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+    async def listen(self):
+        yield {"type": "subscribe", "data": 1}
+        while True:
+            message = await self._messages.get()
+            if isinstance(message, Exception):
+                raise message
+            yield message
+
+
+class StubClient:
+    def __init__(self) -> None:
+        self.subscriptions: list[StubSubscription] = []
+
+    def pubsub(self) -> StubSubscription:
+        return StubSubscription(self)
+
+    async def publish(self, channel: str, data: str) -> None:
+        for subscription in self.subscriptions:
+            if channel in subscription.channels and not subscription.closed:
+                subscription._messages.put_nowait({"type": "message", "data": data})
+
+    def drop_connection(self) -> None:
+        self.subscriptions[-1]._messages.put_nowait(ConnectionError("connection reset"))
+
+
+async def _settle() -> None:
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def test_listener_resubscribes_after_the_connection_drops(monkeypatch):
+    monkeypatch.setattr(pubsub, "RESUBSCRIBE_MIN_SECONDS", 0.01)
+
+    async def scenario():
+        client = StubClient()
+        backend = RedisPubSub(client=client)
+        received = []
+
+        async def handler(user_ids, payload, seqs):
+            received.append((user_ids, payload, seqs))
+
+        await backend.start(handler)
+        await backend.publish([2, 1], {"text": "before"}, {1: 5})
+        await _settle()
+        client.drop_connection()
+        await asyncio.sleep(0.05)
+        await backend.publish([1], {"text": "after"})
+        await _settle()
+        await backend.stop()
+        return client.subscriptions, received
+
+    subscriptions, received = asyncio.run(scenario())
+    assert received == [({1, 2}, {"text": "before"}, {1: 5}), ({1}, {"text": "after"}, {})]
+    assert len(subscriptions) == 2
+    assert all(subscription.closed for subscription in subscriptions)
+
+
+def test_bad_events_do_not_stop_the_listener():
+    async def scenario():
+        client = StubClient()
+        backend = RedisPubSub(client=client)
+        received = []
+
+        async def handler(user_ids, payload, seqs):
+            if payload.get("fail"):
+                raise RuntimeError("delivery failed")
+            received.append(payload)
+
+        await backend.start(handler)
+        await client.publish(pubsub.WS_EVENTS_CHANNEL, "not json")
+        await client.publish(pubsub.WS_EVENTS_CHANNEL, json.dumps({"payload": {}}))
+        await backend.publish([1], {"fail": True})
+        await backend.publish([1], {"text": "ok"})
+        await _settle()
+        await backend.stop()
+        return client.subscriptions, received
+
+    subscriptions, received = asyncio.run(scenario())
+    assert received == [{"text": "ok"}]
+    assert len(subscriptions) == 1